@@ -20,7 +20,10 @@ const COOL_COLORS = new Set(['Blue', 'Green']);
 const STYLES = ['Modern', 'Antique', 'Retro', 'Unusual'];
 const OBJECT_TYPES = ['Lamp', 'Wall Hanging', 'Curio'];
 const OBJ_PLURAL = { 'Lamp': 'lamps', 'Wall Hanging': 'wall hangings', 'Curio': 'curios' };
-const SLOT_KEY = { 'Lamp': 'lamp', 'Wall Hanging': 'wallHanging', 'Curio': 'curio' };
+/** Lowercase form of every color, style and object type, for NL rendering. */
+const LOWER = Object.fromEntries([...COLORS, ...STYLES, ...OBJECT_TYPES].map(v => [v, v.toLowerCase()]));
+/** Index of each object type's slot in Room.slots. */
+const SLOT_INDEX = { 'Lamp': 0, 'Wall Hanging': 1, 'Curio': 2 };
 
 const STYLE_TO_COLOR = {
   'Lamp':         { Modern: 'Blue', Antique: 'Yellow', Retro: 'Red', Unusual: 'Green' },
@@ -125,6 +128,7 @@ class SeededRandom {
   }
   randint(lo, hi) { return lo + Math.floor(this.random() * (hi - lo + 1)); }
   uniform(lo, hi) { return lo + this.random() * (hi - lo); }
+  /** Always consumes exactly one draw, even for a single-element array, so the draw sequence (and every later seeded pick) does not depend on list sizes. */
   choice(arr) { return arr[Math.floor(this.random() * arr.length)]; }
   shuffle(arr) {
     const a = [...arr];
@@ -135,6 +139,8 @@ class SeededRandom {
     return a;
   }
   sample(arr, n) { return this.shuffle(arr).slice(0, n); }
+  /** Advance the stream by n draws (what shuffle() of an (n + 1)-element array consumes). */
+  skip(n) { for (let i = 0; i < n; i++) this.random(); }
   /** Weighted index selection. Returns index into weights array. */
   weightedIndex(weights) {
     const total = weights.reduce((a, b) => a + b, 0);
@@ -152,103 +158,275 @@ class SeededRandom {
 // SECTION 3: STATE REPRESENTATION
 // ================================================================
 
+// Bitmask encoding. Each closed enumeration gets one bit per value, and each
+// of the 12 tokens gets bit (typeIndex * 4 + styleIndex), so a room's contents
+// fit in a 12-bit "token mask". Style/color/type masks of a room are derived
+// from its token mask through the lookup tables below.
+const COLOR_BIT = {}, STYLE_BIT = {}, TYPE_BIT = {};
+COLORS.forEach((c, i) => { COLOR_BIT[c] = 1 << i; });
+STYLES.forEach((st, i) => { STYLE_BIT[st] = 1 << i; });
+OBJECT_TYPES.forEach((ot, i) => { TYPE_BIT[ot] = 1 << i; });
+const WARM_BITS = [...WARM_COLORS].reduce((m, c) => m | COLOR_BIT[c], 0);
+const COOL_BITS = [...COOL_COLORS].reduce((m, c) => m | COLOR_BIT[c], 0);
+
+/** Token-mask bits of all tokens with a given color / style / type. */
+const COLOR_TOKENS = {}, STYLE_TOKENS = {}, TYPE_TOKENS = {};
+for (const c of COLORS) COLOR_TOKENS[c] = 0;
+for (const st of STYLES) STYLE_TOKENS[st] = 0;
+for (const ot of OBJECT_TYPES) TYPE_TOKENS[ot] = 0;
+let WARM_TOKENS = 0, COOL_TOKENS = 0;
+
+/** Interned tokens: one frozen object per (objType, style), so tokens compare by identity. */
+const TOKENS = {};
+const TOKEN_BY_INDEX = [];
+OBJECT_TYPES.forEach((ot, ti) => {
+  TOKENS[ot] = {};
+  STYLES.forEach((st, si) => {
+    const color = STYLE_TO_COLOR[ot][st], bit = 1 << (ti * STYLES.length + si);
+    TOKENS[ot][st] = Object.freeze({ objType: ot, style: st, color, bit, styleIndex: si });
+    TOKEN_BY_INDEX.push(TOKENS[ot][st]);
+    COLOR_TOKENS[color] |= bit; STYLE_TOKENS[st] |= bit; TYPE_TOKENS[ot] |= bit;
+    if (WARM_COLORS.has(color)) WARM_TOKENS |= bit;
+    if (COOL_COLORS.has(color)) COOL_TOKENS |= bit;
+  });
+});
+
+const TOKEN_MASKS = 1 << (OBJECT_TYPES.length * STYLES.length);
+/** Token mask -> style / color / type mask. */
+const TOKEN_STYLE_BITS = new Uint8Array(TOKEN_MASKS);
+const TOKEN_COLOR_BITS = new Uint8Array(TOKEN_MASKS);
+const TOKEN_TYPE_BITS = new Uint8Array(TOKEN_MASKS);
+for (let m = 1; m < TOKEN_MASKS; m++) {
+  const low = m & -m, prev = m ^ low;
+  const tok = TOKEN_BY_INDEX[31 - Math.clz32(low)];
+  TOKEN_STYLE_BITS[m] = TOKEN_STYLE_BITS[prev] | STYLE_BIT[tok.style];
+  TOKEN_COLOR_BITS[m] = TOKEN_COLOR_BITS[prev] | COLOR_BIT[tok.color];
+  TOKEN_TYPE_BITS[m] = TOKEN_TYPE_BITS[prev] | TYPE_BIT[tok.objType];
+}
+
+/** Number of set bits in a 32-bit integer (SWAR). */
+function popcount(x) {
+  x -= (x >>> 1) & 0x55555555;
+  x = (x & 0x33333333) + ((x >>> 2) & 0x33333333);
+  return Math.imul((x + (x >>> 4)) & 0x0F0F0F0F, 0x01010101) >>> 24;
+}
+
 function makeToken(objType, style) {
-  return { objType, style, color: STYLE_TO_COLOR[objType][style] };
+  return TOKENS[objType][style];
 }
 
 class Room {
   constructor(name, wallColor) {
     this.name = name;
     this.wallColor = wallColor;
-    this.lamp = null;
-    this.wallHanging = null;
-    this.curio = null;
-  }
-  getObject(ot) { return this[SLOT_KEY[ot]]; }
-  setObject(ot, token) { this[SLOT_KEY[ot]] = token; }
-  getObjects() { return [this.lamp, this.wallHanging, this.curio].filter(Boolean); }
-  objectCount() { return this.getObjects().length; }
-  hasStyle(st) { return this.getObjects().some(o => o.style === st); }
-  hasObjColor(c) { return this.getObjects().some(o => o.color === c); }
+    this.wallBit = COLOR_BIT[wallColor];
+    /** Objects by SLOT_INDEX (null when empty). */
+    this.slots = [null, null, null];
+    /** Bit per token present (see TOKENS); maintained by setObject(). */
+    this.tokenBits = 0;
+    // Object list, rebuilt lazily after setObject().
+    this._objs = null;
+    this._dirty = true;
+  }
+  clone() {
+    const r = new Room(this.name, this.wallColor);
+    const sl = this.slots;
+    r.slots = [sl[0], sl[1], sl[2]];
+    r.tokenBits = this.tokenBits;
+    r._objs = this._objs; r._dirty = this._dirty;
+    return r;
+  }
+  paint(color) { this.wallColor = color; this.wallBit = COLOR_BIT[color]; }
+  getObject(ot) { return this.slots[SLOT_INDEX[ot]]; }
+  setObject(ot, token) {
+    const i = SLOT_INDEX[ot], old = this.slots[i];
+    if (old) this.tokenBits &= ~old.bit;
+    if (token) this.tokenBits |= token.bit;
+    this.slots[i] = token;
+    this._dirty = true;
+  }
+  _rebuild() {
+    const objs = [];
+    for (const o of this.slots) if (o) objs.push(o);
+    this._objs = objs;
+    this._dirty = false;
+  }
+  /** Non-null objects in slot order. The returned array is shared; do not mutate it. */
+  getObjects() { if (this._dirty) this._rebuild(); return this._objs; }
+  get styleBits() { return TOKEN_STYLE_BITS[this.tokenBits]; }
+  get colorBits() { return TOKEN_COLOR_BITS[this.tokenBits]; }
+  get typeBits() { return TOKEN_TYPE_BITS[this.tokenBits]; }
+  objectCount() { return popcount(this.tokenBits); }
+  hasStyle(st) { return (TOKEN_STYLE_BITS[this.tokenBits] & STYLE_BIT[st]) !== 0; }
+  hasObjColor(c) { return (TOKEN_COLOR_BITS[this.tokenBits] & COLOR_BIT[c]) !== 0; }
+  /** Wall color and each slot's style (or empty) in mixed radix; below FP_ROOM_STATES. */
+  stateCode() {
+    let code = 31 - Math.clz32(this.wallBit);
+    for (const obj of this.slots) code = code * FP_SLOT_STATES + (obj ? obj.styleIndex + 1 : 0);
+    return code;
+  }
 }
 
+// House-wide token masks: room i's token mask sits at bit 12 * (i % 2) of
+// word i >> 1, so every (room, token) pair has its own bit and a house count
+// is two popcounts.
+const TOKEN_BITS = OBJECT_TYPES.length * STYLES.length;
+const ROOM_INDEX_2P = Object.fromEntries(ROOMS_2P.map((rn, i) => [rn, i]));
+const ROOM_INDEX_34P = Object.fromEntries(ROOMS_34P.map((rn, i) => [rn, i]));
+
+const FP_SLOT_STATES = STYLES.length + 1;
+const FP_ROOM_STATES = COLORS.length * FP_SLOT_STATES ** OBJECT_TYPES.length;
+/** Place value of each slot digit and of the wall digit within a room's state code. */
+const FP_SLOT_WEIGHT = OBJECT_TYPES.map((_, i) => FP_SLOT_STATES ** (OBJECT_TYPES.length - 1 - i));
+const FP_WALL_WEIGHT = FP_SLOT_STATES ** OBJECT_TYPES.length;
+/** Place value of each room (by roomIndex) within the fingerprint; all layouts have 4 rooms. */
+const FP_ROOM_WEIGHT = ROOMS_2P.map((_, i) => FP_ROOM_STATES ** (ROOMS_2P.length - 1 - i));
+
 class HouseState {
   constructor(numPlayers) {
     this.numPlayers = numPlayers;
     this.roomNames = numPlayers === 2 ? [...ROOMS_2P] : [...ROOMS_34P];
     this.rooms = {};
     for (const rn of this.roomNames) this.rooms[rn] = new Room(rn, 'Red');
+    this.roomIndex = numPlayers === 2 ? ROOM_INDEX_2P : ROOM_INDEX_34P;
+    /** House-wide token masks (rooms 0-1, rooms 2-3); maintained by setObject(). */
+    this.tokensLo = 0;
+    this.tokensHi = 0;
+    this._allObjs = null;
+    this._fp = null;
   }
   get layout() { return this.numPlayers === 2 ? LAYOUT_2P : LAYOUT_34P; }
 
+  /** All objects, rooms in roomNames order. The returned array is shared; do not mutate it. */
   getAllObjects() {
+    if (this._allObjs !== null) return this._allObjs;
     const out = [];
     for (const rn of this.roomNames) out.push(...this.rooms[rn].getObjects());
+    this._allObjs = out;
     return out;
   }
+  objectCount() { return popcount(this.tokensLo) + popcount(this.tokensHi); }
+  /** Token mask of every token present anywhere in the house. */
+  tokenUnion() {
+    const m = this.tokensLo | this.tokensHi;
+    return (m | (m >>> TOKEN_BITS)) & ((1 << TOKEN_BITS) - 1);
+  }
   areaRoomNames(area) { return this.layout[area]; }
-  countRoomsColor(color) { return this.roomNames.filter(rn => this.rooms[rn].wallColor === color).length; }
-  countObjColor(color) { return this.getAllObjects().filter(o => o.color === color).length; }
-  countObjStyle(style) { return this.getAllObjects().filter(o => o.style === style).length; }
-  countObjType(ot) { return this.roomNames.filter(rn => this.rooms[rn].getObject(ot) !== null).length; }
-  countWarm() { return this.getAllObjects().filter(o => WARM_COLORS.has(o.color)).length; }
-  countCool() { return this.getAllObjects().filter(o => COOL_COLORS.has(o.color)).length; }
+  /** Number of objects whose token bit is in `tokenMask`, over `roomNames` (default: whole house). */
+  countTokens(tokenMask, roomNames) {
+    if (roomNames === undefined) {
+      const m = tokenMask | (tokenMask << TOKEN_BITS);
+      return popcount(this.tokensLo & m) + popcount(this.tokensHi & m);
+    }
+    let n = 0;
+    for (const rn of roomNames) n += popcount(this.rooms[rn].tokenBits & tokenMask);
+    return n;
+  }
+  /** OR of `prop` ('styleBits' | 'colorBits' | 'typeBits') over the rooms of an area. */
+  areaBits(area, prop) {
+    let m = 0;
+    for (const rn of this.layout[area]) m |= this.rooms[rn][prop];
+    return m;
+  }
+  countRoomsColor(color) {
+    const bit = COLOR_BIT[color];
+    let n = 0;
+    for (const rn of this.roomNames) if (this.rooms[rn].wallBit === bit) n++;
+    return n;
+  }
+  countObjColor(color) { return this.countTokens(COLOR_TOKENS[color]); }
+  countObjStyle(style) { return this.countTokens(STYLE_TOKENS[style]); }
+  countObjType(ot) { return this.countTokens(TYPE_TOKENS[ot]); }
+  countWarm() { return this.countTokens(WARM_TOKENS); }
+  countCool() { return this.countTokens(COOL_TOKENS); }
   /** Feature = object type + wall color. Room has feature (objType, color) iff it has that object and that wall color. */
   roomHasFeature(rn, objType, color) {
     const r = this.rooms[rn];
-    return r && r.getObject(objType) !== null && r.wallColor === color;
+    return r && (r.typeBits & TYPE_BIT[objType]) !== 0 && r.wallBit === COLOR_BIT[color];
   }
   countRoomsWithFeature(objType, color) {
-    return this.roomNames.filter(rn => this.roomHasFeature(rn, objType, color)).length;
+    const tb = TYPE_BIT[objType], wb = COLOR_BIT[color];
+    let n = 0;
+    for (const rn of this.roomNames) {
+      const r = this.rooms[rn];
+      if (r.wallBit === wb && (r.typeBits & tb) !== 0) n++;
+    }
+    return n;
   }
 
-  // Actions (for perturbation)
+  // Mutators. All board changes go through these, which update the cached
+  // fingerprint in place (one digit changes) instead of dropping it.
+  setObject(rn, ot, token) {
+    const room = this.rooms[rn], i = this.roomIndex[rn];
+    if (this._fp !== null) {
+      const si = SLOT_INDEX[ot], old = room.slots[si];
+      const delta = (token ? token.styleIndex + 1 : 0) - (old ? old.styleIndex + 1 : 0);
+      this._fp += delta * FP_SLOT_WEIGHT[si] * FP_ROOM_WEIGHT[i];
+    }
+    room.setObject(ot, token);
+    const shift = TOKEN_BITS * (i & 1);
+    const word = ((i >> 1) ? this.tokensHi : this.tokensLo) & ~(((1 << TOKEN_BITS) - 1) << shift);
+    if (i >> 1) this.tokensHi = word | (room.tokenBits << shift);
+    else this.tokensLo = word | (room.tokenBits << shift);
+    this._allObjs = null;
+  }
   addObject(rn, token) {
     if (this.rooms[rn].getObject(token.objType) !== null) return false;
-    this.rooms[rn].setObject(token.objType, token);
+    this.setObject(rn, token.objType, token);
     return true;
   }
   removeObject(rn, ot) {
     const old = this.rooms[rn].getObject(ot);
     if (!old) return null;
-    this.rooms[rn].setObject(ot, null);
+    this.setObject(rn, ot, null);
     return old;
   }
   swapObject(rn, token) {
     const old = this.rooms[rn].getObject(token.objType);
     if (!old) return null;
-    this.rooms[rn].setObject(token.objType, token);
+    this.setObject(rn, token.objType, token);
     return old;
   }
   paintRoom(rn, color) {
-    const old = this.rooms[rn].wallColor;
-    this.rooms[rn].wallColor = color;
+    const room = this.rooms[rn], old = room.wallColor;
+    if (this._fp !== null) {
+      const delta = (31 - Math.clz32(COLOR_BIT[color])) - (31 - Math.clz32(room.wallBit));
+      this._fp += delta * FP_WALL_WEIGHT * FP_ROOM_WEIGHT[this.roomIndex[rn]];
+    }
+    room.paint(color);
     return old;
   }
 
-  deepCopy() {
-    const copy = new HouseState(this.numPlayers);
-    for (const rn of this.roomNames) {
-      const r = this.rooms[rn];
-      copy.rooms[rn] = new Room(r.name, r.wallColor);
-      for (const ot of OBJECT_TYPES) {
-        const obj = r.getObject(ot);
-        if (obj) copy.rooms[rn].setObject(ot, makeToken(obj.objType, obj.style));
-      }
-    }
+  /**
+   * Copy of this state. Tokens are never mutated, so they are shared by
+   * reference; object-list caches are shared too since they are replaced,
+   * never mutated.
+   */
+  clone() {
+    const copy = Object.create(HouseState.prototype);
+    copy.numPlayers = this.numPlayers;
+    copy.roomNames = this.roomNames;
+    copy.rooms = {};
+    for (const rn of this.roomNames) copy.rooms[rn] = this.rooms[rn].clone();
+    copy.roomIndex = this.roomIndex;
+    copy.tokensLo = this.tokensLo;
+    copy.tokensHi = this.tokensHi;
+    copy._allObjs = this._allObjs;
+    copy._fp = this._fp;
     return copy;
   }
+  /**
+   * Integer identifying the board: per room, wall color and each slot's style
+   * (or empty) in mixed radix, rooms in roomNames order. At most
+   * FP_ROOM_STATES^4 (~6e10), so it stays an exact double. Computed once,
+   * then kept current by the mutators.
+   */
   fingerprint() {
-    const parts = [];
-    for (const rn of [...this.roomNames].sort()) {
-      const r = this.rooms[rn];
-      parts.push(r.wallColor);
-      for (const ot of OBJECT_TYPES) {
-        const obj = r.getObject(ot);
-        parts.push(obj ? obj.style : '');
-      }
-    }
-    return parts.join('|');
+    if (this._fp !== null) return this._fp;
+    let fp = 0;
+    for (const rn of this.roomNames) fp = fp * FP_ROOM_STATES + this.rooms[rn].stateCode();
+    this._fp = fp;
+    return fp;
   }
   serialize() {
     return {
@@ -280,10 +458,10 @@ class HouseState {
     for (const roomData of data.rooms) {
       const rn = roomData.name;
       if (!state.rooms[rn]) continue;
-      state.rooms[rn].wallColor = roomData.wallColor;
-      if (roomData.lamp) state.rooms[rn].setObject('Lamp', makeToken('Lamp', roomData.lamp.style));
-      if (roomData.wallHanging) state.rooms[rn].setObject('Wall Hanging', makeToken('Wall Hanging', roomData.wallHanging.style));
-      if (roomData.curio) state.rooms[rn].setObject('Curio', makeToken('Curio', roomData.curio.style));
+      state.paintRoom(rn, roomData.wallColor);
+      if (roomData.lamp) state.setObject(rn, 'Lamp', makeToken('Lamp', roomData.lamp.style));
+      if (roomData.wallHanging) state.setObject(rn, 'Wall Hanging', makeToken('Wall Hanging', roomData.wallHanging.style));
+      if (roomData.curio) state.setObject(rn, 'Curio', makeToken('Curio', roomData.curio.style));
     }
     return state;
   }
@@ -365,11 +543,6 @@ const CType = {
   MORE_COLOR_THAN_COLOR: 'MORE_COLOR_THAN_COLOR',
 };
 
-/** Helper: get all objects in an area */
-function areaObjects(s, area) {
-  return s.areaRoomNames(area).flatMap(rn => s.rooms[rn].getObjects());
-}
-
 /** Leftmost object in room (first in ROOM_OBJECT_ORDER that exists). Returns { objType, style, color } or null. */
 function getLeftmostObject(s, rn) {
   const order = ROOM_OBJECT_ORDER[rn] || OBJECT_TYPES;
@@ -394,29 +567,32 @@ function getRightmostObject(s, rn) {
 /** Room has a "color feature" (literal sense): that wall color OR that object color. */
 function roomHasColorFeature(s, rn, color) {
   const r = s.rooms[rn];
-  return r.wallColor === color || r.hasObjColor(color);
+  const cb = COLOR_BIT[color];
+  return r.wallBit === cb || (r.colorBits & cb) !== 0;
 }
 
+/** Per-type room tests for abstract features (value unused for emptySlot). */
+const ABSTRACT_FEATURE_TESTS = {
+  objColor:  (r, value) => r.hasObjColor(value),
+  emptySlot: (r) => r.objectCount() < 3,
+  wallColor: (r, value) => r.wallBit === COLOR_BIT[value],
+  objType:   (r, value) => r.getObject(value) !== null,
+  style:     (r, value) => r.hasStyle(value),
+};
+
 /** Abstract feature for inseparable: type is 'objColor'|'emptySlot'|'wallColor'|'objType'|'style'; value for non-emptySlot. */
 function roomHasAbstractFeature(s, rn, feat) {
-  const r = s.rooms[rn];
-  switch (feat.type) {
-    case 'objColor': return r.hasObjColor(feat.value);
-    case 'emptySlot': return r.objectCount() < 3;
-    case 'wallColor': return r.wallColor === feat.value;
-    case 'objType': return r.getObject(feat.value) !== null;
-    case 'style': return r.hasStyle(feat.value);
-    default: return false;
-  }
+  const test = ABSTRACT_FEATURE_TESTS[feat.type];
+  return test ? test(s.rooms[rn], feat.value) : false;
 }
 
 const EVAL = {
-  [CType.ROOM_WALL_COLOR_IS]:     (p, s) => s.rooms[p.room].wallColor === p.color,
-  [CType.ROOM_WALL_COLOR_IS_NOT]: (p, s) => s.rooms[p.room].wallColor !== p.color,
-  [CType.ROOM_WALL_WARM]:         (p, s) => WARM_COLORS.has(s.rooms[p.room].wallColor),
-  [CType.ROOM_WALL_COOL]:         (p, s) => COOL_COLORS.has(s.rooms[p.room].wallColor),
-  [CType.ROOM_HAS_OBJECT_TYPE]:   (p, s) => s.rooms[p.room].getObject(p.objType) !== null,
-  [CType.ROOM_NO_OBJECT_TYPE]:    (p, s) => s.rooms[p.room].getObject(p.objType) === null,
+  [CType.ROOM_WALL_COLOR_IS]:     (p, s) => s.rooms[p.room].wallBit === COLOR_BIT[p.color],
+  [CType.ROOM_WALL_COLOR_IS_NOT]: (p, s) => s.rooms[p.room].wallBit !== COLOR_BIT[p.color],
+  [CType.ROOM_WALL_WARM]:         (p, s) => (s.rooms[p.room].wallBit & WARM_BITS) !== 0,
+  [CType.ROOM_WALL_COOL]:         (p, s) => (s.rooms[p.room].wallBit & COOL_BITS) !== 0,
+  [CType.ROOM_HAS_OBJECT_TYPE]:   (p, s) => (s.rooms[p.room].tokenBits & TYPE_TOKENS[p.objType]) !== 0,
+  [CType.ROOM_NO_OBJECT_TYPE]:    (p, s) => (s.rooms[p.room].tokenBits & TYPE_TOKENS[p.objType]) === 0,
   [CType.ROOM_HAS_STYLE]:         (p, s) => s.rooms[p.room].hasStyle(p.style),
   [CType.ROOM_NO_STYLE]:          (p, s) => !s.rooms[p.room].hasStyle(p.style),
   [CType.ROOM_HAS_COLOR_OBJECT]:  (p, s) => s.rooms[p.room].hasObjColor(p.color),
@@ -451,96 +627,111 @@ const EVAL = {
     const obj = getRightmostObject(s, p.room);
     return obj === null || obj.objType === p.objType;
   },
-  [CType.INSEPARABLE]: (p, s) => s.roomNames.every(rn =>
-    roomHasAbstractFeature(s, rn, { type: p.featureAType, value: p.featureAValue }) ===
-    roomHasAbstractFeature(s, rn, { type: p.featureBType, value: p.featureBValue })),
-  [CType.AREA_HAS_OBJECT_TYPE]:   (p, s) => s.areaRoomNames(p.area).some(rn => s.rooms[rn].getObject(p.objType) !== null),
-  [CType.AREA_NO_OBJECT_TYPE]:    (p, s) => s.areaRoomNames(p.area).every(rn => s.rooms[rn].getObject(p.objType) === null),
-  [CType.AREA_HAS_COLOR_OBJECT]:  (p, s) => areaObjects(s, p.area).some(o => o.color === p.color),
-  [CType.AREA_NO_COLOR_OBJECT]:   (p, s) => !areaObjects(s, p.area).some(o => o.color === p.color),
-  [CType.AREA_HAS_STYLE]:         (p, s) => areaObjects(s, p.area).some(o => o.style === p.style),
-  [CType.AREA_NO_STYLE]:          (p, s) => !areaObjects(s, p.area).some(o => o.style === p.style),
+  [CType.INSEPARABLE]: (p, s) => {
+    const testA = ABSTRACT_FEATURE_TESTS[p.featureAType], testB = ABSTRACT_FEATURE_TESTS[p.featureBType];
+    return s.roomNames.every(rn => {
+      const r = s.rooms[rn];
+      return (testA ? testA(r, p.featureAValue) : false) === (testB ? testB(r, p.featureBValue) : false);
+    });
+  },
+  [CType.AREA_HAS_OBJECT_TYPE]:   (p, s) => (s.areaBits(p.area, 'typeBits') & TYPE_BIT[p.objType]) !== 0,
+  [CType.AREA_NO_OBJECT_TYPE]:    (p, s) => (s.areaBits(p.area, 'typeBits') & TYPE_BIT[p.objType]) === 0,
+  [CType.AREA_HAS_COLOR_OBJECT]:  (p, s) => (s.areaBits(p.area, 'colorBits') & COLOR_BIT[p.color]) !== 0,
+  [CType.AREA_NO_COLOR_OBJECT]:   (p, s) => (s.areaBits(p.area, 'colorBits') & COLOR_BIT[p.color]) === 0,
+  [CType.AREA_HAS_STYLE]:         (p, s) => (s.areaBits(p.area, 'styleBits') & STYLE_BIT[p.style]) !== 0,
+  [CType.AREA_NO_STYLE]:          (p, s) => (s.areaBits(p.area, 'styleBits') & STYLE_BIT[p.style]) === 0,
   [CType.EXACTLY_N_ROOMS_COLOR]:  (p, s) => s.countRoomsColor(p.color) === p.n,
   [CType.AT_LEAST_N_OBJECT_TYPE]: (p, s) => s.countObjType(p.objType) >= p.n,
   [CType.AT_LEAST_N_COLOR_OBJECTS]: (p, s) => s.countObjColor(p.color) >= p.n,
   [CType.AT_LEAST_N_STYLE_OBJECTS]: (p, s) => s.countObjStyle(p.style) >= p.n,
   [CType.NO_COLOR_OBJECTS_IN_HOUSE]: (p, s) => s.countObjColor(p.color) === 0,
-  [CType.ALL_OBJECT_TYPE_SAME_COLOR]: (p, s) => {
-    const objs = s.roomNames.map(rn => s.rooms[rn].getObject(p.objType)).filter(Boolean);
-    return objs.length < 2 || objs.every(o => o.color === p.color);
-  },
-  [CType.ALL_OBJECT_TYPE_SAME_STYLE]: (p, s) => {
-    const objs = s.roomNames.map(rn => s.rooms[rn].getObject(p.objType)).filter(Boolean);
-    return objs.length < 2 || objs.every(o => o.style === p.style);
-  },
+  [CType.ALL_OBJECT_TYPE_SAME_COLOR]: (p, s) => s.countObjType(p.objType) < 2 ||
+    (s.tokenUnion() & TYPE_TOKENS[p.objType] & ~COLOR_TOKENS[p.color]) === 0,
+  [CType.ALL_OBJECT_TYPE_SAME_STYLE]: (p, s) => s.countObjType(p.objType) < 2 ||
+    (s.tokenUnion() & TYPE_TOKENS[p.objType] & ~STYLE_TOKENS[p.style]) === 0,
   [CType.COLOR_ROOM_COUNT_EQUAL]:    (p, s) => s.countRoomsColor(p.colorA) === s.countRoomsColor(p.colorB),
-  [CType.ROOM_WITH_TYPE_MUST_HAVE_TYPE]: (p, s) => s.roomNames.every(rn =>
-    s.rooms[rn].getObject(p.objTypeA) === null || s.rooms[rn].getObject(p.objTypeB) !== null),
+  [CType.ROOM_WITH_TYPE_MUST_HAVE_TYPE]: (p, s) => {
+    const bA = TYPE_BIT[p.objTypeA], bB = TYPE_BIT[p.objTypeB];
+    return s.roomNames.every(rn => { const m = s.rooms[rn].typeBits; return (m & bA) === 0 || (m & bB) !== 0; });
+  },
   [CType.NO_ROOM_MORE_THAN_ONE_STYLE]: (p, s) => s.roomNames.every(rn =>
-    s.rooms[rn].getObjects().filter(o => o.style === p.style).length <= 1),
+    popcount(s.rooms[rn].tokenBits & STYLE_TOKENS[p.style]) <= 1),
   [CType.AT_LEAST_N_WARM_OBJECTS]: (p, s) => s.countWarm() >= p.n,
   [CType.AT_LEAST_N_COOL_OBJECTS]: (p, s) => s.countCool() >= p.n,
 
   // ── Spatial ──────────────────────────────────────────────
   [CType.DIAG_STYLE_NO_WALL_COLOR]: (p, s) => {
+    const sb = STYLE_BIT[p.style], wb = COLOR_BIT[p.color];
     for (const rn of s.roomNames) {
-      if (s.rooms[rn].hasStyle(p.style)) {
+      if (s.rooms[rn].styleBits & sb) {
         const d = getRoomDiagonal(rn, s.numPlayers);
-        if (d && s.rooms[d].wallColor === p.color) return false;
+        if (d && s.rooms[d].wallBit === wb) return false;
       }
     }
     return true;
   },
   [CType.ADJ_STYLE_NO_WALL_COLOR]: (p, s) => {
+    const sb = STYLE_BIT[p.style], wb = COLOR_BIT[p.color];
     for (const rn of s.roomNames) {
-      if (s.rooms[rn].hasStyle(p.style)) {
+      if (s.rooms[rn].styleBits & sb) {
         for (const adj of getAdjacentRooms(rn, s.numPlayers))
-          if (s.rooms[adj].wallColor === p.color) return false;
+          if (s.rooms[adj].wallBit === wb) return false;
       }
     }
     return true;
   },
   [CType.ABOVE_STYLE_NO_WALL_COLOR]: (p, s) => {
+    const sb = STYLE_BIT[p.style], wb = COLOR_BIT[p.color];
     for (const rn of s.roomNames) {
-      if (s.rooms[rn].hasStyle(p.style)) {
+      if (s.rooms[rn].styleBits & sb) {
         const a = getRoomAbove(rn, s.numPlayers);
-        if (a && s.rooms[a].wallColor === p.color) return false;
+        if (a && s.rooms[a].wallBit === wb) return false;
       }
     }
     return true;
   },
   [CType.BELOW_STYLE_NO_WALL_COLOR]: (p, s) => {
+    const sb = STYLE_BIT[p.style], wb = COLOR_BIT[p.color];
     for (const rn of s.roomNames) {
-      if (s.rooms[rn].hasStyle(p.style)) {
+      if (s.rooms[rn].styleBits & sb) {
         const b = getRoomBelow(rn, s.numPlayers);
-        if (b && s.rooms[b].wallColor === p.color) return false;
+        if (b && s.rooms[b].wallBit === wb) return false;
       }
     }
     return true;
   },
   [CType.BESIDE_STYLE_NO_WALL_COLOR]: (p, s) => {
+    const sb = STYLE_BIT[p.style], wb = COLOR_BIT[p.color];
     for (const rn of s.roomNames) {
-      if (s.rooms[rn].hasStyle(p.style)) {
+      if (s.rooms[rn].styleBits & sb) {
         const b = getRoomBeside(rn, s.numPlayers);
-        if (b && s.rooms[b].wallColor === p.color) return false;
+        if (b && s.rooms[b].wallBit === wb) return false;
       }
     }
     return true;
   },
   [CType.DIAG_ROOMS_SAME_WALL]: (p, s) =>
-    getDiagonalPairs(s.numPlayers).every(([a, b]) => s.rooms[a].wallColor === s.rooms[b].wallColor),
+    getDiagonalPairs(s.numPlayers).every(([a, b]) => s.rooms[a].wallBit === s.rooms[b].wallBit),
   [CType.ADJ_ROOMS_DIFF_WALL]: (p, s) =>
-    getAdjacentPairs(s.numPlayers).every(([a, b]) => s.rooms[a].wallColor !== s.rooms[b].wallColor),
+    getAdjacentPairs(s.numPlayers).every(([a, b]) => s.rooms[a].wallBit !== s.rooms[b].wallBit),
 
   // ── Conditional ──────────────────────────────────────────
-  [CType.WALL_COLOR_FORBIDS_STYLE]: (p, s) =>
-    s.roomNames.every(rn => s.rooms[rn].wallColor !== p.color || !s.rooms[rn].hasStyle(p.style)),
-  [CType.STYLE_PAIR_FORBIDDEN]: (p, s) =>
-    s.roomNames.every(rn => !s.rooms[rn].hasStyle(p.styleA) || !s.rooms[rn].hasStyle(p.styleB)),
-  [CType.OBJ_TYPE_REQUIRES_WALL_COLOR]: (p, s) =>
-    s.roomNames.every(rn => s.rooms[rn].getObject(p.objType) === null || s.rooms[rn].wallColor === p.color),
-  [CType.WALL_COLOR_FORBIDS_OBJ_COLOR]: (p, s) =>
-    s.roomNames.every(rn => s.rooms[rn].wallColor !== p.wallColor || !s.rooms[rn].hasObjColor(p.objColor)),
+  [CType.WALL_COLOR_FORBIDS_STYLE]: (p, s) => {
+    const wb = COLOR_BIT[p.color], sb = STYLE_BIT[p.style];
+    return s.roomNames.every(rn => { const r = s.rooms[rn]; return r.wallBit !== wb || (r.styleBits & sb) === 0; });
+  },
+  [CType.STYLE_PAIR_FORBIDDEN]: (p, s) => {
+    const both = STYLE_BIT[p.styleA] | STYLE_BIT[p.styleB];
+    return s.roomNames.every(rn => (s.rooms[rn].styleBits & both) !== both);
+  },
+  [CType.OBJ_TYPE_REQUIRES_WALL_COLOR]: (p, s) => {
+    const tb = TYPE_BIT[p.objType], wb = COLOR_BIT[p.color];
+    return s.roomNames.every(rn => { const r = s.rooms[rn]; return (r.typeBits & tb) === 0 || r.wallBit === wb; });
+  },
+  [CType.WALL_COLOR_FORBIDS_OBJ_COLOR]: (p, s) => {
+    const wb = COLOR_BIT[p.wallColor], cb = COLOR_BIT[p.objColor];
+    return s.roomNames.every(rn => { const r = s.rooms[rn]; return r.wallBit !== wb || (r.colorBits & cb) === 0; });
+  },
   [CType.OBJ_TYPE_FORBIDS_OBJ_TYPE]: (p, s) =>
     s.roomNames.every(rn => s.rooms[rn].getObject(p.objTypeA) === null || s.rooms[rn].getObject(p.objTypeB) === null),
 
@@ -548,44 +739,158 @@ const EVAL = {
   [CType.MORE_WARM_THAN_COOL]: (p, s) => s.countWarm() > s.countCool(),
   [CType.MORE_COOL_THAN_WARM]: (p, s) => s.countCool() > s.countWarm(),
   [CType.WALL_MATCHES_OBJECT]: (p, s) =>
-    s.roomNames.every(rn => s.rooms[rn].objectCount() === 0 || s.rooms[rn].hasObjColor(s.rooms[rn].wallColor)),
+    s.roomNames.every(rn => { const r = s.rooms[rn]; return r.tokenBits === 0 || (r.colorBits & r.wallBit) !== 0; }),
   [CType.NO_WALL_MATCHES_OBJECT]: (p, s) =>
-    s.roomNames.every(rn => !s.rooms[rn].hasObjColor(s.rooms[rn].wallColor)),
-  [CType.COLOR_EXCLUSION_ZONE]: (p, s) => {
-    const ct = s.roomNames.filter(rn => s.rooms[rn].wallColor === p.color && s.rooms[rn].getObject(p.objType) !== null).length;
-    return ct <= 1;
-  },
+    s.roomNames.every(rn => { const r = s.rooms[rn]; return (r.colorBits & r.wallBit) === 0; }),
+  [CType.COLOR_EXCLUSION_ZONE]: (p, s) => s.countRoomsWithFeature(p.objType, p.color) <= 1,
 
   // ── Quantity comparison ──────────────────────────────────
   [CType.MORE_OBJ_COLOR_THAN_STYLE]: (p, s) => s.countObjColor(p.color) > s.countObjStyle(p.style),
   [CType.MORE_OBJ_STYLE_THAN_COLOR]: (p, s) => s.countObjStyle(p.style) > s.countObjColor(p.color),
   [CType.MORE_TYPE_IN_AREA_THAN_TYPE_IN_AREA]: (p, s) => {
-    const cA = s.areaRoomNames(p.areaA).filter(rn => s.rooms[rn].getObject(p.objTypeA) !== null).length;
-    const cB = s.areaRoomNames(p.areaB).filter(rn => s.rooms[rn].getObject(p.objTypeB) !== null).length;
+    const cA = s.countTokens(TYPE_TOKENS[p.objTypeA], s.areaRoomNames(p.areaA));
+    const cB = s.countTokens(TYPE_TOKENS[p.objTypeB], s.areaRoomNames(p.areaB));
     return cA > cB;
   },
   [CType.MORE_COLOR_THAN_COLOR]: (p, s) => s.countObjColor(p.colorA) > s.countObjColor(p.colorB),
 };
 
+/**
+ * Memoized results per layout (0 = 2-player, 1 = 3/4-player):
+ * fingerprint -> Map(constraint key -> bool). The search phases re-evaluate
+ * the same constraints on the same boards (undo/redo in the perturbation
+ * walk, repeated violation counts), so results are shared across HouseState
+ * instances with the same layout and fingerprint. The fingerprint does not
+ * encode the layout, hence one cache each. Bounded by number of boards per
+ * layout; the oldest board is evicted first.
+ */
+const EVAL_CACHES = [new Map(), new Map()];
+const EVAL_CACHE_MAX_STATES = 1024;
+
+/**
+ * Evaluate every constraint against one board in a single tight pass,
+ * returning 0/1 per constraint. Bypasses the evalC memo: used for one-shot
+ * bulk scoring where results would never be looked up again.
+ */
+function evalAll(constraints, state) {
+  const out = new Uint8Array(constraints.length);
+  for (let j = 0; j < constraints.length; j++) {
+    const c = constraints[j];
+    const fn = EVAL[c.ctype];
+    if (!fn) throw new Error(`Unknown constraint: ${c.ctype}`);
+    out[j] = fn(c.params, state) ? 1 : 0;
+  }
+  return out;
+}
+
 function evalC(c, state) {
   const fn = EVAL[c.ctype];
   if (!fn) throw new Error(`Unknown constraint: ${c.ctype}`);
-  return fn(c.params, state);
+  const cache = EVAL_CACHES[state.numPlayers === 2 ? 0 : 1];
+  const fp = state.fingerprint();
+  let memo = cache.get(fp);
+  if (memo === undefined) {
+    if (cache.size >= EVAL_CACHE_MAX_STATES) cache.delete(cache.keys().next().value);
+    memo = new Map();
+    cache.set(fp, memo);
+  }
+  const k = constraintKey(c);
+  let v = memo.get(k);
+  if (v === undefined) { v = fn(c.params, state); memo.set(k, v); }
+  return v;
 }
 
 // ================================================================
 // SECTION 5: CANDIDATE CONSTRAINT GENERATION
 // ================================================================
 
+/** Zeroed counter keyed by each of `keys`. */
+function zeroCounts(keys) {
+  const out = {};
+  for (const k of keys) out[k] = 0;
+  return out;
+}
+
+/**
+ * One pass over the board collecting every count generateCandidates() needs,
+ * so each section does lookups instead of rescanning rooms and objects.
+ */
+function indexState(state) {
+  const idx = {
+    wallColor: zeroCounts(COLORS),
+    objColor: zeroCounts(COLORS),
+    objStyle: zeroCounts(STYLES),
+    objType: zeroCounts(OBJECT_TYPES),
+    feature: {},
+    warm: 0, cool: 0,
+    areaTokens: {},
+    areaType: {},
+  };
+  for (const ot of OBJECT_TYPES) idx.feature[ot] = zeroCounts(COLORS);
+  for (const rn of state.roomNames) {
+    const r = state.rooms[rn];
+    idx.wallColor[r.wallColor]++;
+    for (const ot of OBJECT_TYPES) {
+      const o = r.getObject(ot);
+      if (!o) continue;
+      idx.objType[ot]++;
+      idx.objColor[o.color]++;
+      idx.objStyle[o.style]++;
+      idx.feature[ot][r.wallColor]++;
+      if (WARM_COLORS.has(o.color)) idx.warm++;
+      if (COOL_COLORS.has(o.color)) idx.cool++;
+    }
+  }
+  for (const area of AREA_NAMES) {
+    const arns = state.areaRoomNames(area);
+    idx.areaTokens[area] = arns.reduce((m, rn) => m | state.rooms[rn].tokenBits, 0);
+    idx.areaType[area] = zeroCounts(OBJECT_TYPES);
+    for (const rn of arns) for (const ot of OBJECT_TYPES) if (state.rooms[rn].getObject(ot)) idx.areaType[area][ot]++;
+  }
+  return idx;
+}
+
+/** Abstract features compared by the INSEPARABLE candidates. */
+const INSEPARABLE_FEATURES = [
+  { type: 'emptySlot', value: undefined },
+  ...COLORS.map(c => ({ type: 'objColor', value: c })),
+  ...COLORS.map(c => ({ type: 'wallColor', value: c })),
+  ...OBJECT_TYPES.map(ot => ({ type: 'objType', value: ot })),
+  ...STYLES.map(st => ({ type: 'style', value: st })),
+];
+
+/** Board-independent inputs of generateCandidates(), per player count. */
+const CANDIDATE_PLANS = new Map();
+function candidatePlan(np) {
+  let plan = CANDIDATE_PLANS.get(np);
+  if (!plan) {
+    const roomNames = np === 2 ? ROOMS_2P : ROOMS_34P;
+    plan = {
+      areaRooms: np === 2 ? LAYOUT_2P : LAYOUT_34P,
+      roomsWithAbove: roomNames.filter(rn => getRoomAbove(rn, np)),
+      roomsWithBelow: roomNames.filter(rn => getRoomBelow(rn, np)),
+    };
+    CANDIDATE_PLANS.set(np, plan);
+  }
+  return plan;
+}
+
 function generateCandidates(state) {
+  const idx = indexState(state);
+  const rooms = state.rooms, roomNames = state.roomNames;
+  const { areaRooms, roomsWithAbove, roomsWithBelow } = candidatePlan(state.numPlayers);
   const cands = [];
   const add = (ctype, params, score) => {
     const c = { ctype, params, score };
+    constraintKey(c); // cache now: dedup and assignment look it up repeatedly
     cands.push(c);
   };
+  // Probes for pattern candidates: evaluate directly, without building a
+  // constraint object or filling the evaluation memo with one-off keys.
+  const holds = (ctype, params) => EVAL[ctype](params, state);
 
-  for (const rn of state.roomNames) {
-    const room = state.rooms[rn];
+  for (const rn of roomNames) {
+    const room = rooms[rn];
     for (const color of COLORS) {
       if (room.wallColor === color) add(CType.ROOM_WALL_COLOR_IS, { room: rn, color }, 6.0);
       else add(CType.ROOM_WALL_COLOR_IS_NOT, { room: rn, color }, 3.0);
@@ -607,7 +912,7 @@ function generateCandidates(state) {
     }
     for (const ot of OBJECT_TYPES) {
       for (const color of COLORS) {
-        if (state.roomHasFeature(rn, ot, color)) add(CType.ROOM_HAS_FEATURE, { room: rn, objType: ot, color }, 6.0);
+        if (room.getObject(ot) !== null && room.wallColor === color) add(CType.ROOM_HAS_FEATURE, { room: rn, objType: ot, color }, 6.0);
         else add(CType.ROOM_NO_FEATURE, { room: rn, objType: ot, color }, 4.5);
       }
     }
@@ -615,25 +920,26 @@ function generateCandidates(state) {
 
   for (const ot of OBJECT_TYPES) {
     for (const color of COLORS) {
-      const n = state.countRoomsWithFeature(ot, color);
+      const n = idx.feature[ot][color];
       if (n >= 1 && n <= 3) add(CType.EXACTLY_N_ROOMS_WITH_FEATURE, { objType: ot, color, n }, n <= 2 ? 7.0 : 5.5);
     }
   }
 
   for (const area of AREA_NAMES) {
-    const arns = state.areaRoomNames(area);
-    const aObjs = arns.flatMap(rn => state.rooms[rn].getObjects());
-    const hasObjs = aObjs.length > 0;
+    const arns = areaRooms[area];
+    const aTokens = idx.areaTokens[area];
+    const aTypes = TOKEN_TYPE_BITS[aTokens], aColors = TOKEN_COLOR_BITS[aTokens], aStyles = TOKEN_STYLE_BITS[aTokens];
+    const hasObjs = aTokens !== 0;
     for (const ot of OBJECT_TYPES) {
-      if (arns.some(rn => state.rooms[rn].getObject(ot))) add(CType.AREA_HAS_OBJECT_TYPE, { area, objType: ot }, 6.0);
+      if (aTypes & TYPE_BIT[ot]) add(CType.AREA_HAS_OBJECT_TYPE, { area, objType: ot }, 6.0);
       else add(CType.AREA_NO_OBJECT_TYPE, { area, objType: ot }, 5.5);
     }
     for (const color of COLORS) {
-      if (aObjs.some(o => o.color === color)) add(CType.AREA_HAS_COLOR_OBJECT, { area, color }, 5.5);
+      if (aColors & COLOR_BIT[color]) add(CType.AREA_HAS_COLOR_OBJECT, { area, color }, 5.5);
       else add(CType.AREA_NO_COLOR_OBJECT, { area, color }, hasObjs ? 5.0 : 2.0);
     }
     for (const st of STYLES) {
-      if (aObjs.some(o => o.style === st)) add(CType.AREA_HAS_STYLE, { area, style: st }, 5.5);
+      if (aStyles & STYLE_BIT[st]) add(CType.AREA_HAS_STYLE, { area, style: st }, 5.5);
       else add(CType.AREA_NO_STYLE, { area, style: st }, hasObjs ? 5.0 : 2.0);
     }
     for (const color of COLORS) {
@@ -642,7 +948,7 @@ function generateCandidates(state) {
     }
   }
 
-  for (const rn of state.roomNames) {
+  for (const rn of roomNames) {
     for (const color of COLORS) {
       if (!roomHasColorFeature(state, rn, color))
         add(CType.ROOM_NO_FEATURES_COLOR, { room: rn, color }, 6.5);
@@ -662,9 +968,9 @@ function generateCandidates(state) {
   }
 
   for (const color of COLORS) {
-    const nw = state.countRoomsColor(color);
+    const nw = idx.wallColor[color];
     if (nw >= 1 && nw <= 3) add(CType.EXACTLY_N_ROOMS_COLOR, { color, n: nw }, nw <= 2 ? 7.0 : 5.5);
-    const no = state.countObjColor(color);
+    const no = idx.objColor[color];
     if (no === 0) { add(CType.NO_COLOR_OBJECTS_IN_HOUSE, { color }, 6.0); }
     else {
       for (let k = Math.max(1, no - 1); k <= no; k++)
@@ -672,51 +978,52 @@ function generateCandidates(state) {
     }
   }
   for (const ot of OBJECT_TYPES) {
-    const ct = state.countObjType(ot);
+    const ct = idx.objType[ot];
     if (ct >= 2) for (let k = Math.max(2, ct - 1); k <= ct; k++)
       add(CType.AT_LEAST_N_OBJECT_TYPE, { objType: ot, n: k }, 4.0 + 2.0 * (k / ct));
   }
   for (const st of STYLES) {
-    const ct = state.countObjStyle(st);
+    const ct = idx.objStyle[st];
     if (ct >= 2) for (let k = Math.max(2, ct - 1); k <= ct; k++)
       add(CType.AT_LEAST_N_STYLE_OBJECTS, { style: st, n: k }, 4.0 + 2.0 * (k / ct));
   }
 
   // Global qualitative
+  const present = state.tokenUnion();
   for (const ot of OBJECT_TYPES) {
-    const objs = state.roomNames.map(rn => state.rooms[rn].getObject(ot)).filter(Boolean);
-    if (objs.length >= 2) {
-      const cols = new Set(objs.map(o => o.color));
-      const stys = new Set(objs.map(o => o.style));
-      if (cols.size === 1) add(CType.ALL_OBJECT_TYPE_SAME_COLOR, { objType: ot, color: [...cols][0] }, 7.5);
-      if (stys.size === 1) add(CType.ALL_OBJECT_TYPE_SAME_STYLE, { objType: ot, style: [...stys][0] }, 7.5);
-    }
+    if (idx.objType[ot] < 2) continue;
+    const tokens = present & TYPE_TOKENS[ot];
+    const cols = TOKEN_COLOR_BITS[tokens], stys = TOKEN_STYLE_BITS[tokens];
+    if (popcount(cols) === 1) add(CType.ALL_OBJECT_TYPE_SAME_COLOR, { objType: ot, color: COLORS[31 - Math.clz32(cols)] }, 7.5);
+    if (popcount(stys) === 1) add(CType.ALL_OBJECT_TYPE_SAME_STYLE, { objType: ot, style: STYLES[31 - Math.clz32(stys)] }, 7.5);
   }
 
   // Relational
   for (let i = 0; i < COLORS.length; i++) {
     for (let j = i + 1; j < COLORS.length; j++) {
       const cA = COLORS[i], cB = COLORS[j];
-      if (state.countRoomsColor(cA) === state.countRoomsColor(cB)) {
-        const both = state.countRoomsColor(cA) > 0 && state.countRoomsColor(cB) > 0;
+      if (idx.wallColor[cA] === idx.wallColor[cB]) {
+        const both = idx.wallColor[cA] > 0 && idx.wallColor[cB] > 0;
         add(CType.COLOR_ROOM_COUNT_EQUAL, { colorA: cA, colorB: cB }, both ? 7.5 : 4.0);
       }
     }
   }
+  const typeMasks = roomNames.map(rn => rooms[rn].typeBits);
   for (const tA of OBJECT_TYPES) {
+    const bA = TYPE_BIT[tA];
+    if (!typeMasks.some(m => m & bA)) continue;
     for (const tB of OBJECT_TYPES) {
       if (tA === tB) continue;
-      let valid = true, hasTa = false;
-      for (const rn of state.roomNames) {
-        if (state.rooms[rn].getObject(tA)) { hasTa = true; if (!state.rooms[rn].getObject(tB)) { valid = false; break; } }
+      const bB = TYPE_BIT[tB];
+      if (typeMasks.every(m => (m & bA) === 0 || (m & bB) !== 0)) {
+        add(CType.ROOM_WITH_TYPE_MUST_HAVE_TYPE, { objTypeA: tA, objTypeB: tB }, 8.0);
       }
-      if (valid && hasTa) add(CType.ROOM_WITH_TYPE_MUST_HAVE_TYPE, { objTypeA: tA, objTypeB: tB }, 8.0);
     }
   }
   for (const st of STYLES) {
     let valid = true, exists = false;
-    for (const rn of state.roomNames) {
-      const ct = state.rooms[rn].getObjects().filter(o => o.style === st).length;
+    for (const rn of roomNames) {
+      const ct = popcount(rooms[rn].tokenBits & STYLE_TOKENS[st]);
       if (ct >= 1) exists = true;
       if (ct > 1) { valid = false; break; }
     }
@@ -724,76 +1031,77 @@ function generateCandidates(state) {
   }
 
   // Temperature
-  const wc = state.countWarm(), cc = state.countCool();
+  const wc = idx.warm, cc = idx.cool;
   if (wc >= 2) add(CType.AT_LEAST_N_WARM_OBJECTS, { n: wc }, 5.0);
   if (wc >= 3) add(CType.AT_LEAST_N_WARM_OBJECTS, { n: wc - 1 }, 4.0);
   if (cc >= 2) add(CType.AT_LEAST_N_COOL_OBJECTS, { n: cc }, 5.0);
   if (cc >= 3) add(CType.AT_LEAST_N_COOL_OBJECTS, { n: cc - 1 }, 4.0);
 
   // ── Spatial constraints ──────────────────────────────────
-  const _hasStyle = st => state.roomNames.some(rn => state.rooms[rn].hasStyle(st));
+  const _hasStyle = st => idx.objStyle[st] > 0;
+  const styleBitsOf = (rns) => rns.reduce((m, rn) => m | rooms[rn].styleBits, 0);
+  const stylesWithAbove = styleBitsOf(roomsWithAbove), stylesWithBelow = styleBitsOf(roomsWithBelow);
   for (const st of STYLES) {
     if (!_hasStyle(st)) continue;
     for (const color of COLORS) {
       const dp = { style: st, color };
-      if (evalC({ ctype: CType.DIAG_STYLE_NO_WALL_COLOR, params: dp }, state))
+      if (holds(CType.DIAG_STYLE_NO_WALL_COLOR, dp))
         add(CType.DIAG_STYLE_NO_WALL_COLOR, dp, 7.0);
-      if (evalC({ ctype: CType.ADJ_STYLE_NO_WALL_COLOR, params: dp }, state))
+      if (holds(CType.ADJ_STYLE_NO_WALL_COLOR, dp))
         add(CType.ADJ_STYLE_NO_WALL_COLOR, dp, 6.5);
       // ABOVE: only meaningful if a style room sits on the bottom floor
-      if (state.roomNames.some(rn => state.rooms[rn].hasStyle(st) && getRoomAbove(rn, state.numPlayers)) &&
-          evalC({ ctype: CType.ABOVE_STYLE_NO_WALL_COLOR, params: dp }, state))
+      if ((stylesWithAbove & STYLE_BIT[st]) !== 0 &&
+          holds(CType.ABOVE_STYLE_NO_WALL_COLOR, dp))
         add(CType.ABOVE_STYLE_NO_WALL_COLOR, dp, 6.5);
       // BELOW: only meaningful if a style room sits on the top floor
-      if (state.roomNames.some(rn => state.rooms[rn].hasStyle(st) && getRoomBelow(rn, state.numPlayers)) &&
-          evalC({ ctype: CType.BELOW_STYLE_NO_WALL_COLOR, params: dp }, state))
+      if ((stylesWithBelow & STYLE_BIT[st]) !== 0 &&
+          holds(CType.BELOW_STYLE_NO_WALL_COLOR, dp))
         add(CType.BELOW_STYLE_NO_WALL_COLOR, dp, 6.5);
-      if (evalC({ ctype: CType.BESIDE_STYLE_NO_WALL_COLOR, params: dp }, state))
+      if (holds(CType.BESIDE_STYLE_NO_WALL_COLOR, dp))
         add(CType.BESIDE_STYLE_NO_WALL_COLOR, dp, 6.5);
     }
   }
-  if (evalC({ ctype: CType.DIAG_ROOMS_SAME_WALL, params: {} }, state))
+  if (holds(CType.DIAG_ROOMS_SAME_WALL, {}))
     add(CType.DIAG_ROOMS_SAME_WALL, {}, 7.5);
-  if (evalC({ ctype: CType.ADJ_ROOMS_DIFF_WALL, params: {} }, state))
+  if (holds(CType.ADJ_ROOMS_DIFF_WALL, {}))
     add(CType.ADJ_ROOMS_DIFF_WALL, {}, 8.0);
 
   // ── Conditional constraints ──────────────────────────────
   for (const color of COLORS) {
-    const hasColorRoom = state.roomNames.some(rn => state.rooms[rn].wallColor === color);
-    if (!hasColorRoom) continue;
+    if (idx.wallColor[color] === 0) continue;
     for (const st of STYLES) {
-      if (evalC({ ctype: CType.WALL_COLOR_FORBIDS_STYLE, params: { color, style: st } }, state)) {
+      if (holds(CType.WALL_COLOR_FORBIDS_STYLE, { color, style: st })) {
         const hasIt = _hasStyle(st);
         add(CType.WALL_COLOR_FORBIDS_STYLE, { color, style: st }, hasIt ? 7.5 : 5.0);
       }
     }
     for (const oc of COLORS) {
-      if (evalC({ ctype: CType.WALL_COLOR_FORBIDS_OBJ_COLOR, params: { wallColor: color, objColor: oc } }, state)) {
-        const hasOC = state.countObjColor(oc) > 0;
+      if (holds(CType.WALL_COLOR_FORBIDS_OBJ_COLOR, { wallColor: color, objColor: oc })) {
+        const hasOC = idx.objColor[oc] > 0;
         add(CType.WALL_COLOR_FORBIDS_OBJ_COLOR, { wallColor: color, objColor: oc }, hasOC ? 7.0 : 4.5);
       }
     }
   }
   for (let i = 0; i < STYLES.length; i++) {
     for (let j = i + 1; j < STYLES.length; j++) {
-      if (evalC({ ctype: CType.STYLE_PAIR_FORBIDDEN, params: { styleA: STYLES[i], styleB: STYLES[j] } }, state)) {
+      if (holds(CType.STYLE_PAIR_FORBIDDEN, { styleA: STYLES[i], styleB: STYLES[j] })) {
         const both = _hasStyle(STYLES[i]) && _hasStyle(STYLES[j]);
         add(CType.STYLE_PAIR_FORBIDDEN, { styleA: STYLES[i], styleB: STYLES[j] }, both ? 7.0 : 4.0);
       }
     }
   }
   for (const ot of OBJECT_TYPES) {
-    const roomsWT = state.roomNames.filter(rn => state.rooms[rn].getObject(ot) !== null);
+    const roomsWT = roomNames.filter(rn => rooms[rn].getObject(ot) !== null);
     if (roomsWT.length === 0) continue;
     for (const color of COLORS) {
-      if (roomsWT.every(rn => state.rooms[rn].wallColor === color))
+      if (roomsWT.every(rn => rooms[rn].wallColor === color))
         add(CType.OBJ_TYPE_REQUIRES_WALL_COLOR, { objType: ot, color }, roomsWT.length >= 2 ? 8.0 : 6.0);
     }
   }
   for (let i = 0; i < OBJECT_TYPES.length; i++) {
     for (let j = i + 1; j < OBJECT_TYPES.length; j++) {
-      if (evalC({ ctype: CType.OBJ_TYPE_FORBIDS_OBJ_TYPE, params: { objTypeA: OBJECT_TYPES[i], objTypeB: OBJECT_TYPES[j] } }, state)) {
-        const aE = state.countObjType(OBJECT_TYPES[i]) > 0, bE = state.countObjType(OBJECT_TYPES[j]) > 0;
+      if (holds(CType.OBJ_TYPE_FORBIDS_OBJ_TYPE, { objTypeA: OBJECT_TYPES[i], objTypeB: OBJECT_TYPES[j] })) {
+        const aE = idx.objType[OBJECT_TYPES[i]] > 0, bE = idx.objType[OBJECT_TYPES[j]] > 0;
         if (aE && bE) add(CType.OBJ_TYPE_FORBIDS_OBJ_TYPE, { objTypeA: OBJECT_TYPES[i], objTypeB: OBJECT_TYPES[j] }, 7.5);
       }
     }
@@ -802,18 +1110,18 @@ function generateCandidates(state) {
   // ── Funky constraints ────────────────────────────────────
   if (wc > cc) add(CType.MORE_WARM_THAN_COOL, {}, 6.5);
   if (cc > wc) add(CType.MORE_COOL_THAN_WARM, {}, 6.5);
-  if (evalC({ ctype: CType.WALL_MATCHES_OBJECT, params: {} }, state)) {
-    const roomsWithObj = state.roomNames.filter(rn => state.rooms[rn].objectCount() > 0);
-    if (roomsWithObj.some(rn => state.rooms[rn].hasObjColor(state.rooms[rn].wallColor)))
+  if (holds(CType.WALL_MATCHES_OBJECT, {})) {
+    const roomsWithObj = roomNames.filter(rn => rooms[rn].objectCount() > 0);
+    if (roomsWithObj.some(rn => rooms[rn].hasObjColor(rooms[rn].wallColor)))
       add(CType.WALL_MATCHES_OBJECT, {}, 8.0);
   }
-  if (evalC({ ctype: CType.NO_WALL_MATCHES_OBJECT, params: {} }, state))
+  if (holds(CType.NO_WALL_MATCHES_OBJECT, {}))
     add(CType.NO_WALL_MATCHES_OBJECT, {}, 7.5);
   for (const color of COLORS) {
-    const colorRooms = state.roomNames.filter(rn => state.rooms[rn].wallColor === color);
+    const colorRooms = roomNames.filter(rn => rooms[rn].wallColor === color);
     if (colorRooms.length < 2) continue;
     for (const ot of OBJECT_TYPES) {
-      const withType = colorRooms.filter(rn => state.rooms[rn].getObject(ot) !== null);
+      const withType = colorRooms.filter(rn => rooms[rn].getObject(ot) !== null);
       if (withType.length <= 1)
         add(CType.COLOR_EXCLUSION_ZONE, { color, objType: ot }, withType.length === 1 ? 7.5 : 5.0);
     }
@@ -822,19 +1130,19 @@ function generateCandidates(state) {
   // ── Quantity comparison ──────────────────────────────────
   for (const color of COLORS) {
     for (const st of STYLES) {
-      const co = state.countObjColor(color), so = state.countObjStyle(st);
+      const co = idx.objColor[color], so = idx.objStyle[st];
       if (co > so && co >= 1) add(CType.MORE_OBJ_COLOR_THAN_STYLE, { color, style: st }, 6.0 + Math.min(co - so, 3));
       if (so > co && so >= 1) add(CType.MORE_OBJ_STYLE_THAN_COLOR, { style: st, color }, 6.0 + Math.min(so - co, 3));
     }
   }
   for (const otA of OBJECT_TYPES) {
     for (const areaA of VERTICAL_AREAS) {
-      const cA = state.areaRoomNames(areaA).filter(rn => state.rooms[rn].getObject(otA) !== null).length;
+      const cA = idx.areaType[areaA][otA];
       if (cA === 0) continue;
       for (const otB of OBJECT_TYPES) {
         for (const areaB of VERTICAL_AREAS) {
           if (otA === otB && areaA === areaB) continue;
-          const cB = state.areaRoomNames(areaB).filter(rn => state.rooms[rn].getObject(otB) !== null).length;
+          const cB = idx.areaType[areaB][otB];
           if (cA > cB) add(CType.MORE_TYPE_IN_AREA_THAN_TYPE_IN_AREA, { objTypeA: otA, areaA, objTypeB: otB, areaB }, 6.5);
         }
       }
@@ -843,24 +1151,17 @@ function generateCandidates(state) {
   for (let i = 0; i < COLORS.length; i++) {
     for (let j = 0; j < COLORS.length; j++) {
       if (i === j) continue;
-      const cI = state.countObjColor(COLORS[i]), cJ = state.countObjColor(COLORS[j]);
+      const cI = idx.objColor[COLORS[i]], cJ = idx.objColor[COLORS[j]];
       if (cI > cJ && cI >= 1) add(CType.MORE_COLOR_THAN_COLOR, { colorA: COLORS[i], colorB: COLORS[j] }, 6.0 + Math.min(cI - cJ, 3));
     }
   }
 
   // ── Inseparable (two features with same room set) ────────────────────────
-  const featList = [
-    { type: 'emptySlot', value: undefined },
-    ...COLORS.map(c => ({ type: 'objColor', value: c })),
-    ...COLORS.map(c => ({ type: 'wallColor', value: c })),
-    ...OBJECT_TYPES.map(ot => ({ type: 'objType', value: ot })),
-    ...STYLES.map(st => ({ type: 'style', value: st })),
-  ];
-  const setKey = (rooms) => [...rooms].sort().join(',');
+  const setKey = (rns) => [...rns].sort().join(',');
   const roomSets = new Map();
-  for (const feat of featList) {
-    const rooms = state.roomNames.filter(rn => roomHasAbstractFeature(state, rn, feat));
-    const key = setKey(rooms);
+  for (const feat of INSEPARABLE_FEATURES) {
+    const withFeat = roomNames.filter(rn => roomHasAbstractFeature(state, rn, feat));
+    const key = setKey(withFeat);
     if (!roomSets.has(key)) roomSets.set(key, []);
     roomSets.get(key).push(feat);
   }
@@ -869,7 +1170,7 @@ function generateCandidates(state) {
       for (let j = i + 1; j < feats.length; j++) {
         const a = feats[i], b = feats[j];
         if (a.type === b.type && a.value === b.value) continue;
-        if (evalC({ ctype: CType.INSEPARABLE, params: { featureAType: a.type, featureAValue: a.value, featureBType: b.type, featureBValue: b.value } }, state))
+        if (holds(CType.INSEPARABLE, { featureAType: a.type, featureAValue: a.value, featureBType: b.type, featureBValue: b.value }))
           add(CType.INSEPARABLE, { featureAType: a.type, featureAValue: a.value, featureBType: b.type, featureBValue: b.value }, 8.0);
       }
     }
@@ -878,6 +1179,16 @@ function generateCandidates(state) {
   return cands;
 }
 
+/**
+ * Candidates are only emitted when they hold on the board, so add() does not
+ * re-check them. This re-evaluates them (for tests) through evalAll, bypassing
+ * the evalC memo so a stale entry cannot mask a failure; returns the ones that fail.
+ */
+function verifyCandidates(state, cands) {
+  const ok = evalAll(cands, state);
+  return cands.filter((c, j) => !ok[j]);
+}
+
 // ================================================================
 // SECTION 5b: SOLUTION SPACE SAMPLING (for tight constraint assignment)
 // ================================================================
@@ -886,10 +1197,10 @@ function generateCandidates(state) {
 function sampleRandomBoard(rng, numPlayers) {
   const state = new HouseState(numPlayers);
   for (const rn of state.roomNames) {
-    state.rooms[rn].wallColor = rng.choice(COLORS);
+    state.paintRoom(rn, rng.choice(COLORS));
     for (const ot of OBJECT_TYPES) {
       if (rng.random() < 0.6) {
-        state.rooms[rn].setObject(ot, makeToken(ot, rng.choice(STYLES)));
+        state.setObject(rn, ot, makeToken(ot, rng.choice(STYLES)));
       }
     }
   }
@@ -898,7 +1209,7 @@ function sampleRandomBoard(rng, numPlayers) {
 
 /** One board by random walk from T (steps in 1..maxSteps). */
 function sampleBoardByWalk(rng, T, maxSteps) {
-  const state = T.deepCopy();
+  const state = T.clone();
   const steps = rng.randint(1, Math.max(1, maxSteps));
   const allowed = ['paint', 'swap', 'remove', 'add'];
   for (let i = 0; i < steps; i++) {
@@ -940,12 +1251,17 @@ function countSatisfying(pool, conditions) {
 // Terminology: "objects" = wall hanging, curio, lamp. "Features" = objects + wall color.
 // We use "object(s)" in conditions for anything about lamp/wall hanging/curio; we do not use "items".
 
+/** Lowercase a param value; enum values come from LOWER, anything else is converted. */
+function lower(v) {
+  return v ? (LOWER[v] || v.toLowerCase()) : '';
+}
+
 function formatAbstractFeature(type, value) {
   if (type === 'emptySlot') return 'empty slot';
-  if (type === 'objColor') return (value || '').toLowerCase() + ' object';
-  if (type === 'wallColor') return (value || '').toLowerCase() + ' wall';
-  if (type === 'objType') return (value || '').toLowerCase();
-  if (type === 'style') return (value || '').toLowerCase() + ' object';
+  if (type === 'objColor') return lower(value) + ' object';
+  if (type === 'wallColor') return lower(value) + ' wall';
+  if (type === 'objType') return lower(value);
+  if (type === 'style') return lower(value) + ' object';
   return type;
 }
 
@@ -1024,74 +1340,130 @@ const VOICE_PREFIXES = {
   neutral:    [''],
 };
 
+/**
+ * Ordered literal rewrites per voice, applied to the space-padded sentence
+ * so that " must " only matches whole words ("must not" before "must").
+ */
+const VOICE_REWRITES = {
+  formal: [[' must not ', ' not '], [' must ', ' '], [' may not ', ' not '], [' may ', ' ']],
+  other:  [[' must not ', ' not to '], [' must ', ' to '], [' may not ', ' not to '], [' may ', ' to ']],
+};
+
+/** Rewrite a sentence for a voiced prefix. Only applied to templates, at load (see NL_BY_VOICE). */
 function transformVoice(text, voice) {
-  let core = text.replace(/\.$/, '');
-  core = core[0].toLowerCase() + core.slice(1);
-  if (voice === 'formal') {
-    core = core.replace(/\bmust not\b/g, 'not').replace(/\bmust\b/g, '').replace(/\bmay not\b/g, 'not').replace(/\bmay\b/g, '');
-    core = core.replace(/ {2,}/g, ' ');
-  } else {
-    core = core.replace(/\bmust not\b/g, 'not to').replace(/\bmust\b/g, 'to').replace(/\bmay not\b/g, 'not to').replace(/\bmay\b/g, 'to');
-  }
-  return core;
+  let core = text.endsWith('.') ? text.slice(0, -1) : text;
+  core = ' ' + core[0].toLowerCase() + core.slice(1) + ' ';
+  for (const [from, to] of VOICE_REWRITES[voice === 'formal' ? 'formal' : 'other']) core = core.replaceAll(from, to);
+  return core.slice(1, -1);
 }
 
-function renderNL(rng, c, voice = 'neutral') {
-  const tpl = NL[c.ctype] || `[${c.ctype}]`;
-  const p = c.params;
-  const subs = {
-    room: p.room || '', area: p.area || '', color: p.color || '',
-    colorA: p.colorA || '', colorB: p.colorB || '',
-    n: p.n != null ? String(p.n) : '',
-    objTypeLower: p.objType ? p.objType.toLowerCase() : '',
-    objTypePlural: p.objType ? OBJ_PLURAL[p.objType] : '',
-    objTypeALower: p.objTypeA ? p.objTypeA.toLowerCase() : '',
-    objTypeBLower: p.objTypeB ? p.objTypeB.toLowerCase() : '',
-    objTypeAPlural: p.objTypeA ? OBJ_PLURAL[p.objTypeA] : '',
-    objTypeBPlural: p.objTypeB ? OBJ_PLURAL[p.objTypeB] : '',
-    styleLower: p.style ? p.style.toLowerCase() : '',
-    styleALower: p.styleA ? p.styleA.toLowerCase() : '',
-    styleBLower: p.styleB ? p.styleB.toLowerCase() : '',
-    wallColor: p.wallColor || '',
-    objColor: p.objColor || '',
-    areaA: p.areaA || '', areaB: p.areaB || '',
-    roomWord: p.n === 1 ? 'room' : 'rooms',
-    objWord: p.n === 1 ? 'object' : 'objects',
-    colorLower: (p.color || '').toLowerCase(),
-    featureA: formatAbstractFeature(p.featureAType, p.featureAValue),
-    featureB: formatAbstractFeature(p.featureBType, p.featureBValue),
+/** Template placeholder -> derivation from a constraint's params. */
+const RENDER_ARGS = {
+  room: p => p.room || '', area: p => p.area || '', color: p => p.color || '',
+  colorA: p => p.colorA || '', colorB: p => p.colorB || '',
+  n: p => p.n != null ? String(p.n) : '',
+  objTypeLower: p => lower(p.objType),
+  objTypePlural: p => p.objType ? OBJ_PLURAL[p.objType] : '',
+  objTypeALower: p => lower(p.objTypeA),
+  objTypeBLower: p => lower(p.objTypeB),
+  objTypeAPlural: p => p.objTypeA ? OBJ_PLURAL[p.objTypeA] : '',
+  objTypeBPlural: p => p.objTypeB ? OBJ_PLURAL[p.objTypeB] : '',
+  styleLower: p => lower(p.style),
+  styleALower: p => lower(p.styleA),
+  styleBLower: p => lower(p.styleB),
+  wallColor: p => p.wallColor || '',
+  objColor: p => p.objColor || '',
+  areaA: p => p.areaA || '', areaB: p => p.areaB || '',
+  roomWord: p => p.n === 1 ? 'room' : 'rooms',
+  objWord: p => p.n === 1 ? 'object' : 'objects',
+  colorLower: p => lower(p.color),
+  featureA: p => formatAbstractFeature(p.featureAType, p.featureAValue),
+  featureB: p => formatAbstractFeature(p.featureBType, p.featureBValue),
+};
+
+/**
+ * Compile a template into a params -> string renderer. Placeholders are
+ * resolved to their RENDER_ARGS derivation once here; unknown ones are
+ * kept verbatim.
+ */
+function compileTemplate(tpl) {
+  const parts = tpl.split(/\{(\w+)\}/);
+  if (parts.length === 1) return () => tpl;
+  const pieces = parts.map((part, i) =>
+    i % 2 === 0 ? part : (RENDER_ARGS[part] || (() => `{${part}}`)));
+  return (p) => {
+    let out = '';
+    for (const piece of pieces) out += typeof piece === 'string' ? piece : piece(p);
+    return out;
   };
-  let text = tpl.replace(/\{(\w+)\}/g, (_, k) => subs[k] !== undefined ? subs[k] : `{${k}}`);
+}
 
-  if (voice !== 'neutral') {
-    const prefixes = VOICE_PREFIXES[voice] || [''];
-    const prefix = rng.choice(prefixes);
-    if (prefix) text = prefix + transformVoice(text, voice) + '.';
+/**
+ * Compiled renderers, built once at load: voice -> ctype -> renderer.
+ * Voiced templates have the trailing period stripped and must/may rewritten.
+ */
+const NL_BY_VOICE = {};
+for (const voice of Object.keys(VOICE_PREFIXES)) {
+  NL_BY_VOICE[voice] = {};
+  for (const [ctype, tpl] of Object.entries(NL))
+    NL_BY_VOICE[voice][ctype] = compileTemplate(voice === 'neutral' ? tpl : transformVoice(tpl, voice));
+}
+
+/**
+ * Per-constraint render memo: voice -> filled template. Only the voice
+ * prefix is drawn per call.
+ */
+const RENDER_CACHE = new WeakMap();
+
+/** Filled template of c for a voice (memoized in RENDER_CACHE). */
+function filledTemplate(c, voice) {
+  let texts = RENDER_CACHE.get(c);
+  if (!texts) { texts = {}; RENDER_CACHE.set(c, texts); }
+  let text = texts[voice];
+  if (text === undefined) {
+    const render = NL_BY_VOICE[voice][c.ctype];
+    text = render ? render(c.params) : `[${c.ctype}]`;
+    texts[voice] = text;
   }
   return text;
 }
 
+function renderNL(rng, c, voice = 'neutral') {
+  if (voice === 'neutral') return filledTemplate(c, 'neutral');
+  const prefix = rng.choice(VOICE_PREFIXES[voice] || ['']);
+  if (!prefix) return filledTemplate(c, 'neutral');
+  const text = filledTemplate(c, voice);
+  // Templates may start with a placeholder, so lowercase the first letter after filling.
+  return prefix + text[0].toLowerCase() + text.slice(1) + '.';
+}
+
 // ================================================================
 // SECTION 7: FINAL STATE GENERATION
 // ================================================================
 
+/** Every (room, objType) slot per layout, in room then slot order; frozen, shuffle() copies. */
+const ALL_SLOTS_2P = Object.freeze(ROOMS_2P.flatMap(rn => OBJECT_TYPES.map(ot => Object.freeze([rn, ot]))));
+const ALL_SLOTS_34P = Object.freeze(ROOMS_34P.flatMap(rn => OBJECT_TYPES.map(ot => Object.freeze([rn, ot]))));
+
 function generateFinalState(rng, numPlayers, params) {
   const state = new HouseState(numPlayers);
   const colorsUsed = rng.sample(COLORS, Math.min(params.numColors, 4));
   const stylesUsed = rng.sample(STYLES, Math.min(params.numStyles, 4));
+  const stylesUsedBits = stylesUsed.reduce((m, st) => m | STYLE_BIT[st], 0);
 
-  // Wall colors (at least 2 distinct)
+  // Wall colors (at least 2 distinct). Resampled rather than forced so the
+  // draw sequence, and hence every seeded layout, stays as it was.
   let wallColors;
   for (let a = 0; a < 100; a++) {
     wallColors = state.roomNames.map(() => rng.choice(colorsUsed));
-    if (new Set(wallColors).size >= 2) break;
+    if (wallColors.some(c => c !== wallColors[0])) break;
   }
-  state.roomNames.forEach((rn, i) => { state.rooms[rn].wallColor = wallColors[i]; });
+  state.roomNames.forEach((rn, i) => { state.paintRoom(rn, wallColors[i]); });
 
   // Place objects
   const [minI, maxI] = params.totalObjects;
   const target = rng.randint(minI, maxI);
-  let allSlots = rng.shuffle(state.roomNames.flatMap(rn => OBJECT_TYPES.map(ot => [rn, ot])));
+  const allSlots = rng.shuffle(numPlayers === 2 ? ALL_SLOTS_2P : ALL_SLOTS_34P);
   const themeOt = rng.random() < 0.4 ? rng.choice(OBJECT_TYPES) : null;
   const themeSt = themeOt ? rng.choice(stylesUsed) : null;
   let placed = 0;
@@ -1103,10 +1475,10 @@ function generateFinalState(rng, numPlayers, params) {
       const wc = state.rooms[rn].wallColor;
       if (COLOR_TO_STYLE[ot] && COLOR_TO_STYLE[ot][wc]) {
         const cs = COLOR_TO_STYLE[ot][wc];
-        if (stylesUsed.includes(cs)) style = cs;
+        if (stylesUsedBits & STYLE_BIT[cs]) style = cs;
       }
     }
-    state.rooms[rn].setObject(ot, makeToken(ot, style));
+    state.setObject(rn, ot, makeToken(ot, style));
     placed++;
   }
 
@@ -1114,18 +1486,18 @@ function generateFinalState(rng, numPlayers, params) {
   for (const ot of OBJECT_TYPES) {
     if (state.countObjType(ot) === 0) {
       const empty = state.roomNames.filter(rn => !state.rooms[rn].getObject(ot));
-      if (empty.length) state.rooms[rng.choice(empty)].setObject(ot, makeToken(ot, rng.choice(stylesUsed)));
+      if (empty.length) state.setObject(rng.choice(empty), ot, makeToken(ot, rng.choice(stylesUsed)));
     }
   }
   // Ensure style variety
-  const allStyles = new Set(state.getAllObjects().map(o => o.style));
-  if (allStyles.size < 2 && stylesUsed.length >= 2) {
+  const houseStyles = TOKEN_STYLE_BITS[state.tokenUnion()];
+  if ((houseStyles & (houseStyles - 1)) === 0 && stylesUsed.length >= 2) {
     for (const rn of state.roomNames) {
       for (const ot of OBJECT_TYPES) {
         const obj = state.rooms[rn].getObject(ot);
         if (obj) {
           const others = stylesUsed.filter(s => s !== obj.style);
-          if (others.length) { state.rooms[rn].setObject(ot, makeToken(ot, rng.choice(others))); return state; }
+          if (others.length) { state.setObject(rn, ot, makeToken(ot, rng.choice(others))); return state; }
         }
       }
     }
@@ -1157,8 +1529,20 @@ const WARM_COOL_TYPES = new Set([
   CType.MORE_WARM_THAN_COOL, CType.MORE_COOL_THAN_WARM,
 ]);
 
+/**
+ * Canonical key per constraint object, computed once. Kept out of the object
+ * itself so constraints serialize unchanged; params are never mutated after
+ * construction, so the key cannot go stale.
+ */
+const CONSTRAINT_KEYS = new WeakMap();
+
 function constraintKey(c) {
-  return c.ctype + '::' + Object.entries(c.params || {}).sort().map(([k, v]) => `${k}=${v}`).join(',');
+  let k = CONSTRAINT_KEYS.get(c);
+  if (k === undefined) {
+    k = c.ctype + '::' + Object.entries(c.params || {}).sort().map(([pk, v]) => `${pk}=${v}`).join(',');
+    CONSTRAINT_KEYS.set(c, k);
+  }
+  return k;
 }
 
 function roomInArea(room, area, layout) {
@@ -1332,17 +1716,31 @@ function informationLeakScore(c) {
   return 0.2;
 }
 
+/** Per-constraint fields compared by apparentConflictScore(); constraints never change, so computed once each. */
+const CONFLICT_PROFILES = new WeakMap();
+function conflictProfile(c) {
+  let prof = CONFLICT_PROFILES.get(c);
+  if (!prof) {
+    const p = c.params || {};
+    prof = {
+      room: p.room, area: p.area || p.areaA || p.areaB,
+      color: p.color, style: p.style, positive: !NEGATIVE_TYPES.has(c.ctype),
+    };
+    CONFLICT_PROFILES.set(c, prof);
+  }
+  return prof;
+}
+
 /** Heuristic: apparent conflict with other player's conditions (same zone/room, or positive vs negative about same thing). */
 function apparentConflictScore(c, otherConditions, layout) {
   let score = 0;
-  const areaOf = (cond) => cond.params?.area || cond.params?.areaA || cond.params?.areaB;
-  const roomOf = (cond) => cond.params?.room;
-  const isPositive = (cond) => !NEGATIVE_TYPES.has(cond.ctype);
+  const pc = conflictProfile(c);
   for (const o of otherConditions) {
-    if (roomOf(c) && roomOf(o) && roomOf(c) === roomOf(o)) score += 1.5;
-    if (areaOf(c) && areaOf(o) && [areaOf(c)].flat().some(a => [areaOf(o)].flat().includes(a))) score += 1.2;
-    if (c.params?.color && o.params?.color && c.params.color === o.params.color && isPositive(c) !== isPositive(o)) score += 1.8;
-    if (c.params?.style && o.params?.style && c.params.style === o.params.style && isPositive(c) !== isPositive(o)) score += 1.5;
+    const po = conflictProfile(o);
+    if (pc.room && po.room && pc.room === po.room) score += 1.5;
+    if (pc.area && po.area && pc.area === po.area) score += 1.2;
+    if (pc.color && po.color && pc.color === po.color && pc.positive !== po.positive) score += 1.8;
+    if (pc.style && po.style && pc.style === po.style && pc.positive !== po.positive) score += 1.5;
   }
   return score;
 }
@@ -1382,73 +1780,98 @@ function assignConstraints(rng, state, numPlayers, rulesPerPlayer, warmCoolBias
   const fullCandidates = [...candMap.values()];
   const keyToIndex = new Map();
   fullCandidates.forEach((c, j) => keyToIndex.set(constraintKey(c), j));
-  const satisfied = pool.map(s => fullCandidates.map(c => evalC(c, s)));
+  // Score terms that depend only on the candidate, computed once rather than every round.
+  const leakTerm = fullCandidates.map(c => informationLeakScore(c) * 0.4);
+  const typeBonus = fullCandidates.map(c => HIGH_CONSTRAINING_TYPES.has(c.ctype) ? 0.5 : 0);
+  const ownTerm = fullCandidates.map(c => (c.score || 0) * 0.1);
+  const isNegative = fullCandidates.map(c => NEGATIVE_TYPES.has(c.ctype));
+  // satisfiedBits[j]: bitset over pool boards (bit i = pool[i]) that satisfy candidate j.
+  const words = (poolSize + 31) >>> 5;
+  const satisfiedBits = fullCandidates.map(() => new Uint32Array(words));
+  pool.forEach((s, i) => {
+    const row = evalAll(fullCandidates, s);
+    for (let j = 0; j < row.length; j++) if (row[j]) satisfiedBits[j][i >>> 5] |= 1 << (i & 31);
+  });
 
+  /** Bitset of pool boards satisfying all candidate indices (non-empty). */
+  function intersectIndices(indices) {
+    const acc = satisfiedBits[indices[0]].slice();
+    for (let k = 1; k < indices.length; k++) {
+      const b = satisfiedBits[indices[k]];
+      for (let w = 0; w < words; w++) acc[w] &= b[w];
+    }
+    return acc;
+  }
+  /** Boards in `base` (a bitset, or null for the whole pool) that also satisfy candidate j. */
+  function countWithin(base, j) {
+    const b = satisfiedBits[j];
+    let n = 0;
+    for (let w = 0; w < words; w++) n += popcount(base ? base[w] & b[w] : b[w]);
+    return n;
+  }
   function countSatisfyingIndices(indices) {
     if (!indices.length) return poolSize;
+    const acc = intersectIndices(indices);
     let n = 0;
-    for (let i = 0; i < poolSize; i++) if (indices.every(j => satisfied[i][j])) n++;
+    for (let w = 0; w < words; w++) n += popcount(acc[w]);
     return n;
   }
 
   const assignments = Array.from({ length: numPlayers }, () => []);
-  const usedKeys = new Set();
+  // Candidates not yet assigned, in fullCandidates order (keys are unique, so removal replaces a used-key check).
+  const unused = fullCandidates.slice();
+  const take = (c) => { unused.splice(unused.indexOf(c), 1); };
   const targetTotal = numPlayers * rulesPerPlayer;
 
   while (assignments.flat().length < targetTotal) {
     const allAssigned = assignments.flat();
     const assignedIdx = allAssigned.map(c => keyToIndex.get(constraintKey(c))).filter(j => j !== undefined);
-    const S_count = countSatisfyingIndices(assignedIdx);
+    const assignedBits = assignedIdx.length ? intersectIndices(assignedIdx) : null;
+    let S_count = poolSize;
+    if (assignedBits) { S_count = 0; for (let w = 0; w < words; w++) S_count += popcount(assignedBits[w]); }
     const S_i = assignments.map(list => countSatisfyingIndices(list.map(c => keyToIndex.get(constraintKey(c))).filter(j => j !== undefined)));
+    // The player to receive this round's pick, and the other players' conditions, do not depend on the candidate.
+    const pl = S_i.indexOf(Math.max(...S_i));
+    const otherConditions = assignments.flatMap((list, i) => (i === pl ? [] : list));
 
-    const eligible = fullCandidates.filter(c => {
-      if (usedKeys.has(constraintKey(c))) return false;
-      if (wouldBeRedundant(c, allAssigned, layout)) return false;
-      return true;
-    });
+    const eligible = unused.filter(c => !wouldBeRedundant(c, allAssigned, layout));
 
     if (!eligible.length) break;
 
     let bestScore = -Infinity;
     let bestC = null;
-    let bestPl = 0;
 
     for (const c of eligible) {
       const cIdx = keyToIndex.get(constraintKey(c));
-      const new_S = countSatisfyingIndices(assignedIdx.concat(cIdx));
+      const new_S = countWithin(assignedBits, cIdx);
       const reduction = S_count - new_S;
 
-      const pl = S_i.indexOf(Math.max(...S_i));
-      const otherConditions = assignments.flatMap((list, i) => (i === pl ? [] : list));
       const conflict = apparentConflictScore(c, otherConditions, layout);
-      const leak = informationLeakScore(c);
-      const typeBonus = HIGH_CONSTRAINING_TYPES.has(c.ctype) ? 0.5 : 0;
 
-      let score = reduction * 4 + conflict * 0.8 - leak * 0.4 + typeBonus + (c.score || 0) * 0.1;
-      if (NEGATIVE_TYPES.has(c.ctype)) score += 0.4;
+      let score = reduction * 4 + conflict * 0.8 - leakTerm[cIdx] + typeBonus[cIdx] + ownTerm[cIdx];
+      if (isNegative[cIdx]) score += 0.4;
 
       if (score > bestScore) {
         bestScore = score;
         bestC = c;
-        bestPl = pl;
       }
     }
 
     if (!bestC) break;
 
-    assignments[bestPl].push(bestC);
-    usedKeys.add(constraintKey(bestC));
+    assignments[pl].push(bestC);
+    take(bestC);
   }
 
   // If we didn't fill all slots (e.g. too many redundancies), fallback: add any remaining non-redundant candidates
   for (let pl = 0; pl < numPlayers; pl++) {
     while (assignments[pl].length < rulesPerPlayer) {
       const flat = assignments.flat();
-      const eligible = fullCandidates.filter(c => !usedKeys.has(constraintKey(c)) && !wouldBeRedundant(c, flat, layout));
+      const eligible = unused.filter(c => !wouldBeRedundant(c, flat, layout));
       if (!eligible.length) break;
       const chosen = rng.choice(eligible);
       assignments[pl].push(chosen);
-      usedKeys.add(constraintKey(chosen));
+      take(chosen);
     }
   }
 
@@ -1464,17 +1887,40 @@ function assignConstraints(rng, state, numPlayers, rulesPerPlayer, warmCoolBias
 // SECTION 9: PERTURBATION (Initial Board Generation)
 // ================================================================
 
-function moveKey(m) { return JSON.stringify(m); }
+/**
+ * Build a move. Every move has the same fields (unused ones null), so all
+ * moves share one object shape whatever their action.
+ */
+function makeMove(action, room, objType = null, oldColor = null, newColor = null, oldStyle = null, newStyle = null) {
+  return { action, room, objType, oldColor, newColor, oldStyle, newStyle };
+}
+
+const INVERSE_ACTION = { paint: 'paint', swap: 'swap', remove: 'add', add: 'remove' };
+
+/** Whether m undoes `of`, i.e. equals inverseMove(of), without building the inverse. */
+function isInverseMove(m, of) {
+  return m.action === INVERSE_ACTION[of.action] && m.room === of.room && m.objType === of.objType &&
+    m.oldColor === of.newColor && m.newColor === of.oldColor &&
+    m.oldStyle === of.newStyle && m.newStyle === of.oldStyle;
+}
 
 function inverseMove(m) {
-  if (m.action === 'paint') return { action: 'paint', room: m.room, oldColor: m.newColor, newColor: m.oldColor };
-  if (m.action === 'swap')  return { action: 'swap', room: m.room, objType: m.objType, oldStyle: m.newStyle, newStyle: m.oldStyle };
-  if (m.action === 'remove') return { action: 'add', room: m.room, objType: m.objType, newStyle: m.oldStyle };
-  if (m.action === 'add')    return { action: 'remove', room: m.room, objType: m.objType, oldStyle: m.newStyle };
+  if (m.action === 'paint') return makeMove('paint', m.room, null, m.newColor, m.oldColor);
+  if (m.action === 'swap')  return makeMove('swap', m.room, m.objType, null, null, m.newStyle, m.oldStyle);
+  if (m.action === 'remove') return makeMove('add', m.room, m.objType, null, null, null, m.oldStyle);
+  if (m.action === 'add')    return makeMove('remove', m.room, m.objType, null, null, m.newStyle);
   throw new Error(`Unknown action: ${m.action}`);
 }
 
+/** Per-move description memo; listed moves are frozen and shared across states, so each is rendered once. */
+const MOVE_DESCRIPTIONS = new WeakMap();
 function describeMove(m) {
+  let text = MOVE_DESCRIPTIONS.get(m);
+  if (text === undefined) { text = renderMove(m); MOVE_DESCRIPTIONS.set(m, text); }
+  return text;
+}
+
+function renderMove(m) {
   if (m.action === 'paint') return `Paint ${m.room}: ${m.oldColor} -> ${m.newColor}`;
   if (m.action === 'swap') {
     const oc = STYLE_TO_COLOR[m.objType][m.oldStyle], nc = STYLE_TO_COLOR[m.objType][m.newStyle];
@@ -1492,52 +1938,76 @@ function applyMove(state, m) {
   else if (m.action === 'add') state.addObject(m.room, makeToken(m.objType, m.newStyle));
 }
 
+const MOVE_ACTIONS = ['paint', 'swap', 'remove', 'add'];
+
+/**
+ * Moves of one room, keyed by room name, allowed-action mask and room state
+ * code. A room's moves depend on nothing else, so they are shared across
+ * states and calls; the move objects are frozen for that reason.
+ */
+const ROOM_MOVES = new Map();
+
+function roomMoves(room, actionMask) {
+  const rn = room.name;
+  const key = `${rn}|${actionMask}|${room.stateCode()}`;
+  let moves = ROOM_MOVES.get(key);
+  if (moves) return moves;
+  moves = [];
+  if (actionMask & 1)
+    for (const c of COLORS) if (c !== room.wallColor) moves.push(makeMove('paint', rn, null, room.wallColor, c));
+  if (actionMask & 2)
+    for (const ot of OBJECT_TYPES) { const obj = room.getObject(ot); if (obj) for (const st of STYLES) if (st !== obj.style) moves.push(makeMove('swap', rn, ot, null, null, obj.style, st)); }
+  if (actionMask & 4)
+    for (const ot of OBJECT_TYPES) { const obj = room.getObject(ot); if (obj) moves.push(makeMove('remove', rn, ot, null, null, obj.style)); }
+  if (actionMask & 8)
+    for (const ot of OBJECT_TYPES) if (!room.getObject(ot)) for (const st of STYLES) moves.push(makeMove('add', rn, ot, null, null, null, st));
+  moves.forEach(Object.freeze);
+  ROOM_MOVES.set(key, moves);
+  return moves;
+}
+
+/** All legal moves, rooms in roomNames order. Returns a fresh array of shared, frozen moves. */
 function listAllMoves(state, allowedTypes) {
+  let actionMask = 0;
+  MOVE_ACTIONS.forEach((a, i) => { if (allowedTypes.includes(a)) actionMask |= 1 << i; });
   const moves = [];
   for (const rn of state.roomNames) {
-    const room = state.rooms[rn];
-    if (allowedTypes.includes('paint'))
-      for (const c of COLORS) if (c !== room.wallColor) moves.push({ action: 'paint', room: rn, oldColor: room.wallColor, newColor: c });
-    if (allowedTypes.includes('swap'))
-      for (const ot of OBJECT_TYPES) { const obj = room.getObject(ot); if (obj) for (const st of STYLES) if (st !== obj.style) moves.push({ action: 'swap', room: rn, objType: ot, oldStyle: obj.style, newStyle: st }); }
-    if (allowedTypes.includes('remove'))
-      for (const ot of OBJECT_TYPES) { const obj = room.getObject(ot); if (obj) moves.push({ action: 'remove', room: rn, objType: ot, oldStyle: obj.style }); }
-    if (allowedTypes.includes('add'))
-      for (const ot of OBJECT_TYPES) if (!room.getObject(ot)) for (const st of STYLES) moves.push({ action: 'add', room: rn, objType: ot, newStyle: st });
+    const rm = roomMoves(state.rooms[rn], actionMask);
+    for (let i = 0; i < rm.length; i++) moves.push(rm[i]);
   }
   return moves;
 }
 
-function countViolations(state, assignments) {
-  return assignments.map(rules => rules.filter(r => !evalC(r, state)).length);
-}
-
 function generateInitialState(rng, solution, assignments, config) {
   const { numPerturbations = 6, minViolPerPlayer = 1, allowedTypes = ['paint', 'swap', 'remove', 'add'],
     typeWeights = { paint: 1.0, swap: 1.5, remove: 0.8, add: 0.3 }, maxAttempts = 15 } = config;
 
   let bestState = null, bestMoves = null, bestScore = -1;
+  // Rooms each rule reads (null = whole house): a move can only change rules whose scope contains its room.
+  const scopes = assignments.map(rules => rules.map(r => {
+    const rooms = getReferencedRooms(r, solution.layout);
+    return rooms.size ? rooms : null;
+  }));
 
   for (let attempt = 0; attempt < maxAttempts; attempt++) {
-    const state = solution.deepCopy();
+    const state = solution.clone();
     const visited = new Set([state.fingerprint()]);
     const moves = [];
     let lastMove = null;
 
     // Phase 1: random walk
     for (let step = 0; step < numPerturbations; step++) {
-      const candidates = rng.shuffle(listAllMoves(state, allowedTypes));
-      const weights = candidates.map(m => typeWeights[m.action] || 1.0);
+      // Weighted draws without replacement; the running total drops by each rejected move's weight.
+      const cCopy = rng.shuffle(listAllMoves(state, allowedTypes));
+      const wCopy = cCopy.map(m => typeWeights[m.action] || 1.0);
+      let total = wCopy.reduce((a, b) => a + b, 0);
       let found = false;
-      const tried = new Set();
-      const wCopy = [...weights]; const cCopy = [...candidates];
       while (cCopy.length) {
-        const total = wCopy.reduce((a, b) => a + b, 0);
         if (total <= 0) break;
         let r = rng.random() * total, idx = 0;
         for (let i = 0; i < wCopy.length; i++) { r -= wCopy[i]; if (r <= 0) { idx = i; break; } }
-        const move = cCopy.splice(idx, 1)[0]; wCopy.splice(idx, 1);
-        if (lastMove && moveKey(move) === moveKey(inverseMove(lastMove))) continue;
+        const move = cCopy.splice(idx, 1)[0]; total -= wCopy.splice(idx, 1)[0];
+        if (lastMove && isInverseMove(move, lastMove)) continue;
         applyMove(state, move);
         const fp = state.fingerprint();
         if (visited.has(fp)) { applyMove(state, inverseMove(move)); continue; }
@@ -1546,31 +2016,46 @@ function generateInitialState(rng, solution, assignments, config) {
       if (!found) break;
     }
 
-    // Phase 2: targeted violation fix
+    // Phase 2: targeted violation fix. Rule truth is evaluated once, then
+    // refreshed only for rules in scope of each accepted move.
+    const holds = assignments.map(rules => rules.map(r => evalC(r, state)));
+    const viols = holds.map(h => h.filter(v => !v).length);
+    const refresh = (room) => assignments.forEach((rules, pl) => rules.forEach((r, k) => {
+      const scope = scopes[pl][k];
+      if (scope && !scope.has(room)) return;
+      const v = evalC(r, state);
+      if (v !== holds[pl][k]) { holds[pl][k] = v; viols[pl] += v ? -1 : 1; }
+    }));
     for (let extra = 0; extra < 10; extra++) {
-      const viols = countViolations(state, assignments);
       if (viols.every(v => v >= minViolPerPlayer)) break;
       const under = [];
       viols.forEach((v, i) => { if (v < minViolPerPlayer) under.push(i); });
       if (!under.length) break;
       const pl = rng.choice(under);
-      const satisfied = assignments[pl].filter(r => evalC(r, state));
-      rng.shuffle(satisfied);
+      const satisfied = [];
+      holds[pl].forEach((v, k) => { if (v) satisfied.push(k); });
+      // Targets are tried in rule order; this only keeps the draws of a shuffle whose result was never used.
+      rng.skip(satisfied.length - 1);
+      // The board is restored after every failed trial, so one move list serves all targets.
+      const allMoves = listAllMoves(state, allowedTypes);
+      const prev = moves.length ? moves[moves.length - 1] : null;
       let fixed = false;
-      for (const target of satisfied) {
-        const candidates = rng.shuffle(listAllMoves(state, allowedTypes));
+      for (const k of satisfied) {
+        const target = assignments[pl][k], scope = scopes[pl][k];
+        const candidates = rng.shuffle(allMoves);
         for (const move of candidates) {
-          if (moves.length && moveKey(move) === moveKey(inverseMove(moves[moves.length - 1]))) continue;
+          // A move outside the target's rooms cannot break it.
+          if (scope && !scope.has(move.room)) continue;
+          if (prev && isInverseMove(move, prev)) continue;
           applyMove(state, move);
           const fp = state.fingerprint();
-          if (!visited.has(fp) && !evalC(target, state)) { visited.add(fp); moves.push(move); fixed = true; break; }
+          if (!visited.has(fp) && !evalC(target, state)) { visited.add(fp); moves.push(move); refresh(move.room); fixed = true; break; }
           applyMove(state, inverseMove(move));
         }
         if (fixed) break;
       }
     }
 
-    const viols = countViolations(state, assignments);
     const score = viols.filter(v => v >= minViolPerPlayer).length;
     if (score > bestScore) { bestState = state; bestMoves = moves; bestScore = score; }
     if (score === assignments.length) break;
@@ -1606,7 +2091,7 @@ function minOtherSolutionDepth(initialState, solutionState, allConstraints, inte
       if (fp !== solutionFp && depth < minOther) minOther = depth;
     }
     for (const move of listAllMoves(state, ['paint', 'swap', 'remove', 'add'])) {
-      const next = state.deepCopy();
+      const next = state.clone();
       applyMove(next, move);
       const nextFp = next.fingerprint();
       if (visited.has(nextFp)) continue;
@@ -1627,6 +2112,13 @@ function generateScenario({ numPlayers = 2, difficulty = 'medium', seed = null,
   const [lo, hi] = params.pertRange;
   const maxAssignmentRetries = numPlayers === 2 ? 15 : 1;
   let assignments, initial, moves;
+  // Only the perturbation count varies between attempts.
+  const pertSettings = {
+    minViolPerPlayer: perturbation.minViolPerPlayer != null ? perturbation.minViolPerPlayer : 1,
+    allowedTypes: perturbation.allowedTypes || MOVE_ACTIONS,
+    typeWeights: perturbation.typeWeights || params.pertWeights,
+    maxAttempts: perturbation.maxAttempts || 15,
+  };
 
   for (let assignAttempt = 0; assignAttempt < maxAssignmentRetries; assignAttempt++) {
     const assignSeed = seed != null ? seed + assignAttempt * 100 : undefined;
@@ -1638,11 +2130,8 @@ function generateScenario({ numPlayers = 2, difficulty = 'medium', seed = null,
       const pertSeed = seed != null ? seed * 3 + 7 + pertAttempt * 11 + assignAttempt * 17 : undefined;
       const rng2 = new SeededRandom(pertSeed);
       const pertConfig = {
+        ...pertSettings,
         numPerturbations: perturbation.numPerturbations || new SeededRandom(seed != null ? seed * 2 + pertAttempt + assignAttempt * 13 : undefined).randint(lo, hi),
-        minViolPerPlayer: perturbation.minViolPerPlayer != null ? perturbation.minViolPerPlayer : 1,
-        allowedTypes: perturbation.allowedTypes || ['paint', 'swap', 'remove', 'add'],
-        typeWeights: perturbation.typeWeights || params.pertWeights,
-        maxAttempts: perturbation.maxAttempts || 15,
       };
       const result = generateInitialState(rng2, solution, assignments, pertConfig);
       initial = result.state;
@@ -1683,6 +2172,8 @@ module.exports = {
   HouseState,
   CType,
   evalC,
+  generateCandidates,
+  verifyCandidates,
   listAllMoves,
   applyMove,
   makeToken,
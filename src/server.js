@@ -17,18 +17,24 @@ function genToken() {
   return crypto.randomBytes(6).toString('base64url');
 }
 
+/** Normalize a /api/generate body into generateScenario() options in one pass. */
+function parseGenerateOptions(body) {
+  const { numPlayers = 2, difficulty = 'medium', seed, perturbation, warmCoolBias } = body || {};
+  return {
+    numPlayers: Math.min(5, Math.max(2, parseInt(numPlayers, 10) || 2)),
+    difficulty: DIFFICULTY_PARAMS[difficulty] ? difficulty : 'medium',
+    seed: seed != null ? parseInt(seed, 10) : null,
+    perturbation,
+    warmCoolBias: warmCoolBias != null ? parseFloat(warmCoolBias) : undefined,
+  };
+}
+
 // ── API Routes ────────────────────────────────────────────────
 
 /** POST /api/generate — create a new scenario */
 app.post('/api/generate', (req, res) => {
   try {
-    const { numPlayers = 2, difficulty = 'medium', seed, perturbation, warmCoolBias } = req.body || {};
-    const np = Math.min(5, Math.max(2, parseInt(numPlayers, 10) || 2));
-    const diff = DIFFICULTY_PARAMS[difficulty] ? difficulty : 'medium';
-    const s = seed != null ? parseInt(seed, 10) : null;
-    const wcBias = warmCoolBias != null ? parseFloat(warmCoolBias) : undefined;
-
-    const scenario = generateScenario({ numPlayers: np, difficulty: diff, seed: s, perturbation, warmCoolBias: wcBias });
+    const scenario = generateScenario(parseGenerateOptions(req.body));
     scenario.shares = []; // mutable sharing state
     scenario.playerNames = {}; // { "1": "Alice", "2": "Bob", ... }
     const token = genToken();
@@ -136,6 +142,11 @@ app.get('/scenario/:token', (req, res) => {
 });
 
 // ── Start ─────────────────────────────────────────────────────
-app.listen(PORT, () => {
-  console.log(`Decorum Scenario Generator running at http://localhost:${PORT}`);
-});
+// Listen only when run directly, so the app can be required by harnesses.
+if (require.main === module) {
+  app.listen(PORT, () => {
+    console.log(`Decorum Scenario Generator running at http://localhost:${PORT}`);
+  });
+}
+
+module.exports = { app, parseGenerateOptions };
@@ -9,6 +9,8 @@ const {
   evalC,
   listAllMoves,
   applyMove,
+  generateCandidates,
+  verifyCandidates,
   constraintKey: engineConstraintKey,
   constraintsRedundant: engineConstraintsRedundant,
   findGroupRedundancies: engineFindGroupRedundancies,
@@ -51,6 +53,34 @@ function allConstraints(assignments) {
   return (assignments || []).flat();
 }
 
+/** Deterministic boards reached by walking `count` moves from an empty house (one board per step). */
+function walkBoards(numPlayers, count) {
+  const state = new HouseState(numPlayers);
+  const boards = [];
+  for (let i = 0; i < count; i++) {
+    const moves = listAllMoves(state, ALLOWED_MOVES);
+    applyMove(state, moves[(i * 7919) % moves.length]);
+    boards.push(state.clone());
+  }
+  return boards;
+}
+
+/**
+ * Walk like walkBoards(), reading the fingerprint before every move so the
+ * mutators update it in place. Returns [incremental, recomputed] per step.
+ */
+function walkFingerprints(numPlayers, count) {
+  const state = new HouseState(numPlayers);
+  const out = [];
+  for (let i = 0; i < count; i++) {
+    state.fingerprint();
+    const moves = listAllMoves(state, ALLOWED_MOVES);
+    applyMove(state, moves[(i * 7919) % moves.length]);
+    out.push([state.fingerprint(), HouseState.deserialize(state.serialize()).fingerprint()]);
+  }
+  return out;
+}
+
 function findClosestSolutionDepths(initialBoard, solutionBoard, allConstraintsList, intendedDepthFromLog, stateCap = MAX_BFS_STATES) {
   const initial = HouseState.deserialize(initialBoard);
   const solution = HouseState.deserialize(solutionBoard);
@@ -81,7 +111,7 @@ function findClosestSolutionDepths(initialBoard, solutionBoard, allConstraintsLi
 
     const moves = listAllMoves(state, ALLOWED_MOVES);
     for (const move of moves) {
-      const next = state.deepCopy();
+      const next = state.clone();
       applyMove(next, move);
       const nextFp = next.fingerprint();
       if (visited.has(nextFp)) continue;
@@ -104,6 +134,10 @@ module.exports = {
   findGroupRedundancies,
   allConstraints,
   findClosestSolutionDepths,
+  walkBoards,
+  walkFingerprints,
+  generateCandidates,
+  verifyCandidates,
   ALLOWED_MOVES,
   MAX_BFS_DEPTH,
   MAX_BFS_STATES,
@@ -4,6 +4,8 @@
  *
  * 1. Condition overlap (no redundant conditions)
  * 2. Closest solution (no valid solution strictly closer than intended)
+ * 3. Candidate soundness (every generated candidate holds on its board)
+ * 4. Fingerprint (in-place updates match a fresh computation)
  *
  * Run: npm test
  * HTML report with all player conditions: npm run test:report
@@ -17,11 +19,17 @@ const {
   findGroupRedundancies,
   allConstraints,
   findClosestSolutionDepths,
+  walkBoards,
+  walkFingerprints,
+  generateCandidates,
+  verifyCandidates,
 } = require('./engine-test-helpers.js');
 
 const OVERLAP_SEEDS = 6;
 const CLOSEST_SOLUTION_SEEDS = 3;
 const OVERLAP_NUM_PLAYERS = 5;
+const CANDIDATE_WALK_STEPS = 40;
+const FINGERPRINT_WALK_STEPS = 40;
 
 // ─── Tests: condition overlap ──────────────────────────────────────────────
 
@@ -133,3 +141,32 @@ describe('Closest solution', () => {
     });
   }
 });
+
+// ─── Tests: candidate soundness ────────────────────────────────────────────
+
+describe('Candidate soundness', () => {
+  for (const numPlayers of [2, 3]) {
+    it(`every candidate holds on the board it was generated from (${numPlayers} players)`, () => {
+      for (const [step, state] of walkBoards(numPlayers, CANDIDATE_WALK_STEPS).entries()) {
+        const failing = verifyCandidates(state, generateCandidates(state));
+        assert.equal(
+          failing.length,
+          0,
+          `Step ${step}: candidates not satisfied by their board: ${failing.map(constraintKey).join('; ')}`
+        );
+      }
+    });
+  }
+});
+
+// ─── Tests: fingerprint ────────────────────────────────────────────────────
+
+describe('Fingerprint', () => {
+  for (const numPlayers of [2, 3]) {
+    it(`updated fingerprint matches a fresh one after every move (${numPlayers} players)`, () => {
+      for (const [step, [incremental, fresh]] of walkFingerprints(numPlayers, FINGERPRINT_WALK_STEPS).entries()) {
+        assert.equal(incremental, fresh, `Step ${step}: fingerprint drifted`);
+      }
+    });
+  }
+});